@@ -0,0 +1,204 @@
+#
+# Batch conversion of ROMS drifter simulations to IOOS glider files.
+#
+#     python batchconvert.py -o converted/ "runs/*/floats.nc" --workers 8
+#
+# Every input matching the globs is converted with romssim_write() by a pool
+# of worker processes, to <output dir>/<name><suffix>.nc.  A manifest in the
+# output directory records the size, modification time (and with --hash the
+# SHA-1) of the source of every output, and the conversion options; an output
+# whose source and options haven't changed since it was written is skipped.
+# Outputs are written under a temporary name and renamed when complete, and
+# the manifest is saved after every file, so an interrupted run loses at most
+# the files being converted.
+#
+
+import argparse
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+MANIFEST = "manifest.json"
+HASH_BLOCK_BYTES = 16 * 1024 * 1024
+
+def file_hash(filename):
+    sha = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def source_state(filename):
+    stat = os.stat(filename)
+    return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+def load_manifest(filename):
+    if not os.path.exists(filename):
+        return {}
+    with open(filename) as f:
+        return json.load(f)
+
+def save_manifest(manifest, filename):
+    part = filename + ".part"
+    with open(part, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.rename(part, filename)
+
+def output_name(source, output_dir, suffix):
+    name = os.path.splitext(os.path.basename(source))[0]
+    return os.path.join(output_dir, name + suffix + ".nc")
+
+# Whether output is up to date with source according to its manifest entry.
+# Returns (up to date, entry to record); when only the modification time of
+# the source changed but its hash didn't, the entry is refreshed.
+def is_up_to_date(entry, source, output, options, use_hash):
+    if entry is None or not os.path.exists(output):
+        return False, None
+    if entry.get("source") != source or entry.get("options") != options:
+        return False, None
+    state = source_state(source)
+    if state["size"] != entry.get("size"):
+        return False, None
+    if state["mtime"] == entry.get("mtime"):
+        return True, entry
+    if use_hash and entry.get("sha1") and file_hash(source) == entry["sha1"]:
+        refreshed = dict(entry)
+        refreshed["mtime"] = state["mtime"]
+        return True, refreshed
+    return False, None
+
+# Runs in a worker process.
+def convert(task):
+    source, output, options, use_hash = task
+    # Imported here, NumPy and netCDF4 aren't needed by the parent process.
+    from ioos_glider import romssim_write
+    state = source_state(source)
+    part = output + ".part"
+    t0 = time.time()
+    try:
+        romssim_write(source, part, time_block=options["time_block"],
+                      profile=options["profile"])
+        os.rename(part, output)
+    except Exception as e:
+        if os.path.exists(part):
+            os.remove(part)
+        return source, output, None, "%s: %s" % (type(e).__name__, e)
+    seconds = time.time() - t0
+    entry = {"source": source, "options": options,
+             "size": state["size"], "mtime": state["mtime"],
+             "output_size": os.path.getsize(output),
+             "seconds": seconds,
+             "converted": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+    if use_hash:
+        entry["sha1"] = file_hash(source)
+    return source, output, entry, None
+
+def megabytes_per_second(entry):
+    return entry["size"] / 1e6 / max(entry["seconds"], 1e-9)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Convert ROMS drifter simulations to IOOS glider files.")
+    parser.add_argument("inputs", nargs="+", help="input files or globs")
+    parser.add_argument("-o", "--output-dir", required=True)
+    parser.add_argument("--suffix", default="_glider",
+                        help="appended to the input name (default %(default)s)")
+    parser.add_argument("--manifest", default=None,
+                        help="manifest file (default <output dir>/%s)" % MANIFEST)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--time-block", type=int, default=None,
+                        help="time steps converted at a time")
+    parser.add_argument("--profile", default=None, help="storage profile of the outputs")
+    parser.add_argument("--hash", action="store_true",
+                        help="also compare SHA-1 hashes of the sources")
+    parser.add_argument("--force", action="store_true", help="convert everything")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="only list the files that would be converted")
+    parser.add_argument("--json", action="store_true",
+                        help="report as JSON instead of text")
+    args = parser.parse_args(argv)
+
+    sources = []
+    for pattern in args.inputs:
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            sys.stderr.write("No files match %s\n" % pattern)
+        for match in matches:
+            source = os.path.abspath(match)
+            if source not in sources:
+                sources.append(source)
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+    manifest_file = args.manifest or os.path.join(args.output_dir, MANIFEST)
+    manifest = load_manifest(manifest_file)
+    options = {"time_block": args.time_block, "profile": args.profile}
+
+    tasks, skipped, outputs = [], [], {}
+    for source in sources:
+        output = os.path.abspath(output_name(source, args.output_dir, args.suffix))
+        if output in outputs:
+            parser.error("%s and %s both convert to %s" % (outputs[output], source, output))
+        outputs[output] = source
+        up_to_date, entry = False, None
+        if not args.force:
+            up_to_date, entry = is_up_to_date(manifest.get(output), source, output,
+                                              options, args.hash)
+        if up_to_date:
+            manifest[output] = entry
+            skipped.append(source)
+        else:
+            tasks.append((source, output, options, args.hash))
+
+    report = {"converted": [], "failed": [], "skipped": skipped}
+    if args.dry_run:
+        report["converted"] = [{"source": task[0], "output": task[1]} for task in tasks]
+        tasks = []
+    t0 = time.time()
+    if tasks:
+        pool = multiprocessing.Pool(max(1, min(args.workers, len(tasks))))
+        try:
+            for source, output, entry, error in pool.imap_unordered(convert, tasks):
+                if error is not None:
+                    report["failed"].append({"source": source, "error": error})
+                    if not args.json:
+                        print("FAILED %s: %s" % (source, error))
+                    continue
+                manifest[output] = entry
+                save_manifest(manifest, manifest_file)
+                report["converted"].append({"source": source, "output": output,
+                                            "seconds": entry["seconds"],
+                                            "input_bytes": entry["size"],
+                                            "output_bytes": entry["output_size"],
+                                            "mb_per_second": megabytes_per_second(entry)})
+                if not args.json:
+                    print("%s -> %s  %.1f s  %.1f MB/s" % (source, output, entry["seconds"],
+                                                          megabytes_per_second(entry)))
+        finally:
+            pool.terminate()
+            pool.join()
+    elif skipped and not args.dry_run:
+        save_manifest(manifest, manifest_file)
+    seconds = time.time() - t0
+
+    converted = report["converted"]
+    total = sum(c.get("input_bytes", 0) for c in converted)
+    report["seconds"] = seconds
+    report["mb_per_second"] = total / 1e6 / seconds if seconds and total else 0.
+    if args.json:
+        print(json.dumps(report, indent=2, sort_keys=True))
+    elif args.dry_run:
+        for c in converted:
+            print("would convert %s -> %s" % (c["source"], c["output"]))
+        print("%d to convert, %d up to date" % (len(converted), len(skipped)))
+    else:
+        print("%d converted, %d up to date, %d failed in %.1f s (%.1f MB/s)" %
+              (len(converted), len(skipped), len(report["failed"]), seconds,
+               report["mb_per_second"]))
+    return 1 if report["failed"] else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,282 @@
+#
+# Benchmarks of the conversion and of the web service, on synthetic data.
+#
+#     python benchmark.py --drifters 100 --timesteps 10000 --output results.json
+#     python benchmark.py --compare results.json
+#
+# A ROMS drifter simulation and an IOOS glider file are generated in a
+# temporary directory.  Every case runs in a process of its own so that its
+# peak memory (the maximum resident set size of that process) can be
+# reported; conversions also report the size of their output, requests to the
+# service (made with the Flask test client) the latency of the first request
+# and the median, 95th percentile and throughput of the repeated ones, both
+# rendered (with the response caches cleared) and served from the caches.
+# The import cases time the cold import of the modules in fresh interpreters
+# and report whether the web stack (Flask) was loaded.
+# The results are written as JSON; with --compare the ratio of every metric
+# to an earlier result file is printed as well.
+#
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+import numpy as np
+import netCDF4
+from netCDF4 import Dataset
+
+FILL_VALUE = 1e37
+
+# Random walk of `timesteps` by `drifters` around `start`.
+def random_walk(rng, timesteps, drifters, start, step):
+    return start + np.cumsum(rng.standard_normal((timesteps, drifters)) * step, axis=0)
+
+# Writes a ROMS-like drifter simulation.  A fraction `masked` of the drifters
+# leaves the domain at a random time step, after which its values are fill
+# values, as in real simulations.
+def make_romssim(filename, drifters, timesteps, masked=0.1, seed=0):
+    rng = np.random.RandomState(seed)
+    mask = np.zeros((timesteps, drifters), bool)
+    for j in rng.choice(drifters, int(drifters * masked), replace=False):
+        mask[rng.randint(timesteps):, j] = True
+    with Dataset(filename, 'w') as nc:
+        nc.createDimension('ocean_time', timesteps)
+        nc.createDimension('drifter', drifters)
+        ocean_time = nc.createVariable('ocean_time', 'f8', ('ocean_time',))
+        ocean_time.units = 'seconds since 2013-01-01 00:00:00'
+        ocean_time[:] = np.arange(timesteps) * 3600.
+        fields = [('lon', -70., 0.01), ('lat', 40., 0.01), ('depth', 5., 0.1),
+                  ('rho', 1025., 0.01), ('temp', 10., 0.05), ('salt', 35., 0.01)]
+        for name, start, step in fields:
+            var = nc.createVariable(name, 'f8', ('ocean_time', 'drifter'),
+                                    fill_value=FILL_VALUE)
+            var[:] = np.ma.masked_array(random_walk(rng, timesteps, drifters, start, step), mask)
+
+# Writes an IOOS glider file of `drifters` trajectories with writer_0_0().
+def make_glider(filename, drifters, timesteps, seed=0, profile=None):
+    import ioos_glider
+    rng = np.random.RandomState(seed)
+    start = datetime(2013, 1, 1)
+    times = np.array([start + timedelta(minutes=i) for i in xrange(timesteps)])
+    shape = (timesteps, drifters)
+    uv = np.zeros((1, drifters))
+    ids = np.ones(shape, 'i2')
+    ioos_glider.writer_0_0(filename, times, times[:1], np.arange(drifters), ids, ids,
+                           np.abs(random_walk(rng, timesteps, drifters, 0., 1.)),
+                           random_walk(rng, timesteps, drifters, 40., 0.001),
+                           random_walk(rng, timesteps, drifters, -70., 0.001),
+                           random_walk(rng, timesteps, drifters, 10., 0.1),
+                           random_walk(rng, timesteps, drifters, 4., 0.001),
+                           random_walk(rng, timesteps, drifters, 1025., 0.01),
+                           random_walk(rng, timesteps, drifters, 35., 0.01),
+                           random_walk(rng, timesteps, drifters, 10., 0.05),
+                           uv, uv, uv, uv, profile=profile)
+
+def peak_rss():
+    # Kilobytes on Linux, bytes on OS X.
+    scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+def file_size(filenames):
+    return sum(os.path.getsize(f) for f in filenames)
+
+# Cases.  Each returns a dict of metrics and runs in a fresh process.
+
+def bench_romssim_write(romssim, output, profile=None):
+    import ioos_glider
+    t0 = time.time()
+    ioos_glider.romssim_write(romssim, output, profile=profile)
+    return {'seconds': time.time() - t0, 'output_bytes': file_size([output])}
+
+def bench_romssim_write_parallel(romssim, output, workers, profile=None):
+    import ioos_glider
+    t0 = time.time()
+    outputs = ioos_glider.romssim_write_parallel(romssim, output, workers=workers,
+                                                 profile=profile)
+    return {'seconds': time.time() - t0, 'output_bytes': file_size(outputs)}
+
+def bench_writer(output, drifters, timesteps, profile=None):
+    t0 = time.time()
+    make_glider(output, drifters, timesteps, profile=profile)
+    return {'seconds': time.time() - t0, 'output_bytes': file_size([output])}
+
+# Cold import of module, timed inside a fresh interpreter `repeat` times so
+# that interpreter startup isn't counted.
+IMPORT_SCRIPT = """
+import sys, time
+t0 = time.time()
+import %s
+print(time.time() - t0)
+print(int('flask' in sys.modules))
+print(len(sys.modules))
+"""
+
+def bench_import(module, repeat):
+    # The cases run in the temporary directory, the modules are next to this
+    # script.
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(p for p in [os.path.dirname(os.path.abspath(__file__)),
+                                                    env.get('PYTHONPATH')] if p)
+    seconds = []
+    for _ in xrange(max(1, repeat)):
+        output = subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT % module], env=env)
+        elapsed, flask, modules = output.split()
+        seconds.append(float(elapsed))
+    return {'median_seconds': float(np.median(seconds)),
+            'min_seconds': min(seconds),
+            'flask_loaded': int(flask),
+            'modules_loaded': int(modules)}
+
+def get_seconds(client, url):
+    t0 = time.time()
+    client.get(url)
+    return time.time() - t0
+
+def latency_stats(latencies, prefix=''):
+    return {prefix + 'median_seconds': float(np.median(latencies)),
+            prefix + 'p95_seconds': float(np.percentile(latencies, 95)),
+            prefix + 'requests_per_second': len(latencies) / sum(latencies)}
+
+# The repeated requests are timed twice: with the response caches cleared
+# before each one, i.e. rendered every time, and then served from the caches
+# (reported with a cached_ prefix).
+def bench_endpoint(url, repeat):
+    import geojsonservice
+    caches = (geojsonservice.geojson_cache, geojsonservice.metadata_cache,
+              geojsonservice.pyramid_cache)
+    client = geojsonservice.app.test_client()
+    t0 = time.time()
+    response = client.get(url)
+    first = time.time() - t0
+    if response.status_code != 200:
+        raise RuntimeError("%s returned %d" % (url, response.status_code))
+    uncached = []
+    for _ in xrange(repeat):
+        for cache in caches:
+            cache.clear()
+        uncached.append(get_seconds(client, url))
+    cached = [get_seconds(client, url) for _ in xrange(repeat)]
+    result = {'first_seconds': first,
+              'response_bytes': len(response.data)}
+    result.update(latency_stats(uncached))
+    result.update(latency_stats(cached, 'cached_'))
+    return result
+
+def run_case(queue, function, args):
+    try:
+        result = function(*args)
+        result['peak_rss_bytes'] = peak_rss()
+        queue.put((result, None))
+    except Exception as e:
+        queue.put((None, "%s: %s" % (type(e).__name__, e)))
+
+def measure(function, *args):
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=run_case, args=(queue, function, args))
+    process.start()
+    result, error = queue.get()
+    process.join()
+    if error is not None:
+        return {'error': error}
+    return result
+
+def get_cases(args, directory):
+    romssim = os.path.join(directory, 'romssim.nc')
+    glider = os.path.join(directory, 'glider.nc')
+    cases = [('import_ioos_glider', bench_import, ('ioos_glider', args.repeat)),
+             ('import_geojsonservice', bench_import, ('geojsonservice', args.repeat)),
+             ('romssim_write', bench_romssim_write,
+              (romssim, os.path.join(directory, 'converted.nc'), args.profile)),
+             ('romssim_write_parallel', bench_romssim_write_parallel,
+              (romssim, os.path.join(directory, 'parallel.nc'), args.workers, args.profile)),
+             ('writer_0_0', bench_writer,
+              (os.path.join(directory, 'written.nc'), args.drifters, args.timesteps,
+               args.profile))]
+    # The service resolves relative paths against the working directory.
+    name = os.path.basename(glider)
+    for label, url in [('geojson', '/geojson/' + name),
+                       ('geojson_precision', '/geojson/' + name + '?precision=5'),
+                       ('geojson_simplify', '/geojson/' + name + '?simplify=dp&vertices=500'),
+                       ('geojson_bin', '/geojson/' + name + '?format=bin'),
+                       ('metadata', '/metadata/' + name),
+                       ('tile', '/tiles/0/0/0/' + name)]:
+        cases.append((label, bench_endpoint, (url, args.repeat)))
+    return cases
+
+def compare(results, baseline):
+    previous = dict((r['name'], r) for r in baseline['results'])
+    for result in results['results']:
+        old = previous.get(result['name'])
+        if old is None:
+            continue
+        for key in sorted(result):
+            if isinstance(result[key], (int, long, float)):
+                if key in old and old[key]:
+                    print("%-24s %-20s %8.2fx" % (result['name'], key, float(result[key]) / old[key]))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the conversion and the web service.")
+    parser.add_argument('--drifters', type=int, default=50)
+    parser.add_argument('--timesteps', type=int, default=5000)
+    parser.add_argument('--masked', type=float, default=0.1,
+                        help="fraction of drifters that leave the domain")
+    parser.add_argument('--repeat', type=int, default=20,
+                        help="requests per endpoint after the first")
+    parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+    parser.add_argument('--profile', default=None, help="storage profile of the output")
+    parser.add_argument('--cases', default=None,
+                        help="comma separated names of the cases to run")
+    parser.add_argument('--output', default=None, help="result file (default stdout)")
+    parser.add_argument('--compare', default=None, help="earlier result file")
+    args = parser.parse_args(argv)
+
+    directory = tempfile.mkdtemp(prefix='ioos_glider_benchmark')
+    cwd = os.getcwd()
+    try:
+        t0 = time.time()
+        make_romssim(os.path.join(directory, 'romssim.nc'), args.drifters,
+                     args.timesteps, args.masked)
+        make_glider(os.path.join(directory, 'glider.nc'), args.drifters, args.timesteps)
+        setup = time.time() - t0
+        os.chdir(directory)
+        selected = args.cases.split(',') if args.cases else None
+        results = []
+        for name, function, case_args in get_cases(args, directory):
+            if selected is None or name in selected:
+                result = measure(function, *case_args)
+                result['name'] = name
+                results.append(result)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    results = {'created': datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ'),
+               'platform': platform.platform(),
+               'python': platform.python_version(),
+               'numpy': np.__version__,
+               'netCDF4': netCDF4.__version__,
+               'parameters': {'drifters': args.drifters, 'timesteps': args.timesteps,
+                              'masked': args.masked, 'repeat': args.repeat,
+                              'workers': args.workers, 'profile': args.profile},
+               'setup_seconds': setup,
+               'results': results}
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,184 @@
+#
+# Catalog of the trajectories of many datasets, for "what passed through this
+# box in this time window" queries.
+#
+# Every trajectory is stored as a list of pieces, the bounding boxes in lon,
+# lat and time (unix seconds) of runs of consecutive points, together with a
+# simplified track for display.  Neighbouring pieces share a point, so the
+# segment between them is covered too.  A query matches the trajectories that
+# have a piece intersecting the bbox and time window; a match is exact up to
+# the size of a piece, nothing that passed through the box is missed.
+#
+# The pieces of all trajectories are indexed by a packed R-tree (TrajectoryIndex)
+# over (lon, lat, time) boxes, built in one go with Sort-Tile-Recursive and
+# rebuilt when the catalog changes.  The catalog is persisted as JSON:
+#
+#     {"datasets": {url: {"date_modified": ..., "ingested": ...,
+#                         "trajectories": [trajectory, ...]}}}
+#
+# where a trajectory is {"id", "start", "end", "bbox", "pieces", "lon",
+# "lat", "time"}, pieces being [minlon, minlat, mintime, maxlon, maxlat,
+# maxtime] lists.  Unknown times are null; pieces without a time only match
+# queries without a time window.
+#
+
+import json
+import os
+import threading
+import numpy as np
+
+NODE_SIZE = 16
+
+def _str_order(centers, index, node_size, dim):
+    # Sort-Tile-Recursive: sort along dim, cut into slabs that hold a whole
+    # number of nodes and sort those along the next dimension.
+    index = index[np.argsort(centers[index, dim], kind="mergesort")]
+    ndims = centers.shape[1]
+    if dim == ndims - 1 or len(index) <= node_size:
+        return index
+    nodes = -(-len(index) // node_size)
+    slabs = int(np.ceil(nodes ** (1. / (ndims - dim))))
+    per_slab = node_size * -(-nodes // slabs)
+    return np.concatenate([_str_order(centers, index[i:i + per_slab], node_size, dim + 1)
+                           for i in xrange(0, len(index), per_slab)])
+
+# Packed R-tree of n boxes, an n by 2k array of the k minima followed by the
+# k maxima.  The children of node i of a level are nodes i * node_size to
+# (i + 1) * node_size - 1 of the level below, so the tree is just the array of
+# boxes of every level.
+class TrajectoryIndex(object):
+
+    def __init__(self, boxes, node_size=NODE_SIZE):
+        boxes = np.asarray(boxes, np.float64)
+        self.node_size = node_size
+        self.ndims = boxes.shape[1] // 2
+        lo, hi = boxes[:, :self.ndims], boxes[:, self.ndims:]
+        # Boxes without a known extent (e.g. no time) sort by their known
+        # dimensions only.
+        with np.errstate(invalid="ignore"):
+            centers = np.where(np.isfinite(lo) & np.isfinite(hi), (lo + hi) / 2., 0.)
+        self.order = _str_order(centers, np.arange(len(boxes)), node_size, 0)
+        level = boxes[self.order]
+        levels = [level]
+        while len(level) > node_size:
+            starts = np.arange(0, len(level), node_size)
+            level = np.hstack((np.minimum.reduceat(level[:, :self.ndims], starts),
+                               np.maximum.reduceat(level[:, self.ndims:], starts)))
+            levels.append(level)
+        self.levels = levels[::-1]
+
+    def __len__(self):
+        return len(self.order)
+
+    # Indices of the boxes intersecting box (same layout as the boxes).
+    def query(self, box):
+        box = np.asarray(box, np.float64)
+        if not len(self.order):
+            return np.zeros(0, int)
+        lo, hi = box[:self.ndims], box[self.ndims:]
+        nodes = np.arange(len(self.levels[0]))
+        for depth, level in enumerate(self.levels):
+            b = level[nodes]
+            nodes = nodes[np.all((b[:, :self.ndims] <= hi) & (b[:, self.ndims:] >= lo), axis=1)]
+            if depth < len(self.levels) - 1:
+                nodes = (nodes[:, None] * self.node_size + np.arange(self.node_size)).ravel()
+                nodes = nodes[nodes < len(self.levels[depth + 1])]
+        return np.sort(self.order[nodes])
+
+# Pieces of a trajectory: boxes of runs of piece_points points, each sharing
+# its last point with the next one.  times may be NaN.
+def get_pieces(lon, lat, times, piece_points):
+    lon, lat = np.asarray(lon, np.float64), np.asarray(lat, np.float64)
+    times = np.asarray(times, np.float64)
+    n = len(lon)
+    if n == 0:
+        return []
+    starts = np.arange(0, n, piece_points)
+    # The first point of the next piece.
+    nexts = np.minimum(starts + piece_points, n - 1)
+    columns = []
+    for reduce, values in ((np.fmin, lon), (np.fmin, lat), (np.fmin, times),
+                           (np.fmax, lon), (np.fmax, lat), (np.fmax, times)):
+        columns.append(reduce(reduce.reduceat(values, starts), values[nexts]))
+    pieces = np.column_stack(columns)
+    return [[None if np.isnan(v) else float(v) for v in piece] for piece in pieces]
+
+def _boxes(pieces):
+    boxes = np.array(pieces, np.float64).reshape(-1, 6)
+    # Unknown times: an empty interval at +inf..-inf only intersects the
+    # unbounded window.
+    boxes[:, 2] = np.where(np.isnan(boxes[:, 2]), np.inf, boxes[:, 2])
+    boxes[:, 5] = np.where(np.isnan(boxes[:, 5]), -np.inf, boxes[:, 5])
+    return boxes
+
+class Catalog(object):
+
+    def __init__(self, filename=None, node_size=NODE_SIZE):
+        self.filename = filename
+        self.node_size = node_size
+        self.datasets = {}
+        self._index = None
+        self._lock = threading.Lock()
+        if filename is not None and os.path.exists(filename):
+            with open(filename) as f:
+                self.datasets = json.load(f).get("datasets", {})
+
+    def __len__(self):
+        return len(self.datasets)
+
+    def __contains__(self, url):
+        return url in self.datasets
+
+    def get(self, url):
+        return self.datasets.get(url)
+
+    def put(self, url, entry):
+        with self._lock:
+            self.datasets[url] = entry
+            self._index = None
+
+    def remove(self, url):
+        with self._lock:
+            if self.datasets.pop(url, None) is not None:
+                self._index = None
+
+    # Written to a temporary file and renamed, so the catalog on disk is
+    # always complete.
+    def save(self):
+        with self._lock:
+            part = self.filename + ".part"
+            with open(part, "w") as f:
+                json.dump({"datasets": self.datasets}, f, sort_keys=True)
+            os.rename(part, self.filename)
+
+    def _get_index(self):
+        with self._lock:
+            if self._index is None:
+                trajectories, boxes, owners = [], [], []
+                for url in sorted(self.datasets):
+                    for trajectory in self.datasets[url]["trajectories"]:
+                        if trajectory["pieces"]:
+                            boxes.append(_boxes(trajectory["pieces"]))
+                            owners.append(np.repeat(len(trajectories), len(trajectory["pieces"])))
+                        trajectories.append((url, trajectory))
+                boxes = np.vstack(boxes) if boxes else np.zeros((0, 6))
+                owners = np.concatenate(owners) if owners else np.zeros(0, int)
+                self._index = (TrajectoryIndex(boxes, self.node_size), owners, trajectories)
+            return self._index
+
+    # (url, trajectory) of the trajectories that passed through bbox
+    # (minlon, minlat, maxlon, maxlat, crossing the antimeridian when minlon
+    # > maxlon) between the unix times start and end.  None is unbounded.
+    def query(self, bbox=None, start=None, end=None):
+        index, owners, trajectories = self._get_index()
+        t0 = -np.inf if start is None else start
+        t1 = np.inf if end is None else end
+        if bbox is None:
+            boxes = [(-np.inf, -np.inf, np.inf, np.inf)]
+        elif bbox[0] <= bbox[2]:
+            boxes = [bbox]
+        else:
+            boxes = [(bbox[0], bbox[1], np.inf, bbox[3]), (-np.inf, bbox[1], bbox[2], bbox[3])]
+        hits = [index.query((x0, y0, t0, x1, y1, t1)) for x0, y0, x1, y1 in boxes]
+        matches = np.unique(owners[np.concatenate(hits)])
+        return [trajectories[i] for i in matches]
@@ -0,0 +1,75 @@
+#
+# JSON text for coordinate arrays, written straight from NumPy buffers.
+#
+# With a precision every value is rounded to that many decimals and rendered
+# digit by digit as a 2D character array (one row per point); insignificant
+# leading and trailing zeros are masked out and the kept characters are joined
+# in a single call, so no Python object is created per point.  Without a
+# precision the full float repr is used.
+#
+
+import json
+import numpy as np
+
+# Beyond this the scaled values don't fit the int64 digit arithmetic.
+MAX_PRECISION = 10
+
+def _digits(x, precision):
+    # Character and keep arrays (both n by width) of the fixed point
+    # representation of x, laid out as sign, integer digits, point, decimals.
+    scale = 10 ** precision
+    v = np.rint(np.abs(x) * scale).astype(np.int64)
+    neg = (x < 0) & (v != 0)
+    ni = len(str(int(v.max() // scale))) if len(v) else 1
+    nd = ni + precision
+    powers = 10 ** np.arange(nd - 1, -1, -1, dtype=np.int64)
+    digits = (v[:, None] // powers) % 10
+    nonzero = digits != 0
+    keep_int = np.maximum.accumulate(nonzero[:, :ni], axis=1)
+    keep_int[:, -1] = True
+    chars = [np.where(neg, ord("-"), 0)[:, None], digits[:, :ni] + ord("0")]
+    keep = [neg[:, None], keep_int]
+    if precision > 0:
+        keep_frac = np.maximum.accumulate(nonzero[:, ni:][:, ::-1], axis=1)[:, ::-1]
+        chars += [np.full((len(v), 1), ord("."), np.int64), digits[:, ni:] + ord("0")]
+        keep += [keep_frac[:, :1], keep_frac]
+    return np.hstack(chars).astype(np.uint8), np.hstack(keep)
+
+def _column(n, c):
+    return np.full((n, 1), ord(c), np.uint8), np.ones((n, 1), bool)
+
+def dumps_coords(lon, lat, precision=None):
+    lon = np.asarray(lon, np.float64)
+    lat = np.asarray(lat, np.float64)
+    n = len(lon)
+    if n == 0:
+        return "[]"
+    if precision is None or np.abs(np.concatenate((lon, lat))).max() * 10 ** precision >= 2 ** 62:
+        if precision is not None:
+            lon, lat = np.round(lon, precision), np.round(lat, precision)
+        return json.dumps(np.column_stack((lon, lat)).tolist())
+    parts = [_column(n, "["), _digits(lon, precision), _column(n, ","),
+             _digits(lat, precision), _column(n, "]"), _column(n, ",")]
+    chars = np.hstack([p[0] for p in parts])
+    keep = np.hstack([p[1] for p in parts])
+    keep[-1, -1] = False
+    return "[" + chars[keep].tobytes().decode("ascii") + "]"
+
+# Google encoded polyline of the points, in (lat, lon) order as the format
+# expects.  The 5 bit chunks of all deltas are produced at once, like the
+# digits above.
+def encode_polyline(lon, lat, precision=5):
+    scale = 10 ** precision
+    points = np.rint(np.column_stack((lat, lon)) * scale).astype(np.int64)
+    if len(points) == 0:
+        return ""
+    deltas = np.diff(np.vstack(([[0, 0]], points)), axis=0).ravel()
+    v = np.where(deltas < 0, ~(deltas << 1), deltas << 1).astype(np.uint64)
+    shifts = np.arange(0, 64, 5, dtype=np.uint64)
+    chunks = (v[:, None] >> shifts) & np.uint64(0x1f)
+    more = np.zeros(chunks.shape, bool)
+    more[:, :-1] = (v[:, None] >> shifts[1:]) != 0
+    keep = np.ones(chunks.shape, bool)
+    keep[:, 1:] = more[:, :-1]
+    chars = (chunks | np.where(more, np.uint64(0x20), np.uint64(0))) + np.uint64(63)
+    return chars.astype(np.uint8)[keep].tobytes().decode("ascii")
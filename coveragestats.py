@@ -0,0 +1,66 @@
+#
+# Running extents and counts of data written in blocks.
+#
+# update(name, data) folds a block of any shape into the minimum, maximum and
+# number of valid values of name; masked values, NaN and infinities, and
+# values equal to fill_value are not valid.  The block is scanned once, in
+# pieces of BLOCK_SIZE values that stay in the CPU cache while their minimum
+# and maximum are taken, so the statistics of a whole array cost about one
+# read of it however it is written (at once or appended block by block).
+#
+#     stats = CoverageStats()
+#     for block in blocks:
+#         stats.update("lat", block["lat"])
+#     lo, hi = stats.extent("lat")
+#
+
+import numpy as np
+
+BLOCK_SIZE = 64 * 1024
+
+class CoverageStats(object):
+
+    def __init__(self):
+        # name: [min, max] of the valid values, absent while there are none.
+        self.extents = {}
+        # name: number of valid values, and of all values seen.
+        self.counts = {}
+        self.sizes = {}
+
+    def update(self, name, data, fill_value=None):
+        data = np.ma.asanyarray(data)
+        values = np.ma.getdata(data).ravel()
+        mask = np.ma.getmask(data)
+        if mask is not np.ma.nomask:
+            mask = mask.ravel()
+        floats = values.dtype.kind in "fc"
+        lo, hi, count = None, None, 0
+        for i in xrange(0, len(values), BLOCK_SIZE):
+            piece = values[i:i + BLOCK_SIZE]
+            valid = np.isfinite(piece) if floats else None
+            if fill_value is not None:
+                valid = piece != fill_value if valid is None else valid & (piece != fill_value)
+            if mask is not np.ma.nomask:
+                valid = ~mask[i:i + BLOCK_SIZE] if valid is None else valid & ~mask[i:i + BLOCK_SIZE]
+            if valid is not None and not valid.all():
+                piece = piece[valid]
+            if not len(piece):
+                continue
+            count += len(piece)
+            piece_lo, piece_hi = piece.min(), piece.max()
+            lo = piece_lo if lo is None else min(lo, piece_lo)
+            hi = piece_hi if hi is None else max(hi, piece_hi)
+        self.sizes[name] = self.sizes.get(name, 0) + len(values)
+        self.counts[name] = self.counts.get(name, 0) + count
+        if lo is not None:
+            if name in self.extents:
+                lo = min(lo, self.extents[name][0])
+                hi = max(hi, self.extents[name][1])
+            self.extents[name] = [lo, hi]
+
+    # (min, max) of the valid values of name, None if there are none.
+    def extent(self, name):
+        if name not in self.extents:
+            return None
+        return tuple(self.extents[name])
+
@@ -0,0 +1,164 @@
+#
+# Pool of open netCDF4 Datasets (OPeNDAP urls) shared by the requests of the
+# web service.
+#
+# There is one handle per url.  netCDF4 is not thread-safe, so every handle
+# has its own lock and is used by one request at a time:
+#
+#     with pool.dataset(url) as nc:
+#         ...
+#
+# Handles that haven't been used for `idle_timeout` seconds are closed on
+# the next checkout, and once `max_open` handles are open the least recently
+# used idle one is closed to make room (when all of them are busy the pool
+# temporarily grows beyond `max_open`).  A handle is closed and dropped when
+# the block using it raises an IOError or RuntimeError (what netCDF4 raises
+# for failed reads), since the connection behind it may be broken; other
+# exceptions, e.g. an abort(400) for a bad request, leave it pooled.
+#
+# Only urls for which `pooled(url)` is true are kept open, by default remote
+# ones.  Local files are opened for each checkout and closed after it: an open
+# HDF5 handle keeps the file from being rewritten (or, without HDF5 file
+# locking, reads a rewritten file as the old one), and opening a local file
+# is cheap anyway.
+#
+
+import threading
+import time
+from netCDF4 import Dataset
+
+def is_remote(url):
+    return "://" in url
+
+class _Handle(object):
+
+    def __init__(self, url):
+        self.url = url
+        self.nc = None
+        self.lock = threading.Lock()
+        self.users = 0
+        self.closed = False
+        self.last_used = time.time()
+
+    def close(self):
+        self.closed = True
+        if self.nc is not None:
+            try:
+                self.nc.close()
+            except RuntimeError:
+                pass
+            self.nc = None
+
+class _Checkout(object):
+
+    def __init__(self, pool, url):
+        self.pool = pool
+        self.url = url
+        self.handle = None
+        self.nc = None
+
+    def __enter__(self):
+        if not self.pool.pooled(self.url):
+            self.nc = self.pool.opener(self.url)
+            return self.nc
+        self.handle = self.pool._acquire(self.url)
+        return self.handle.nc
+
+    def __exit__(self, exc_type, exc_value, tb):
+        # Only I/O errors say anything about the connection; a bad request
+        # or a streamed response closed early by its client doesn't.
+        broken = exc_type is not None and issubclass(exc_type, (IOError, RuntimeError))
+        if self.handle is None:
+            try:
+                self.nc.close()
+            except RuntimeError:
+                pass
+            return False
+        self.pool._release(self.handle, broken)
+        return False
+
+class DatasetPool(object):
+
+    def __init__(self, max_open=16, idle_timeout=300., opener=Dataset, pooled=is_remote):
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.opener = opener
+        self.pooled = pooled
+        self._handles = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._handles)
+
+    def __contains__(self, url):
+        return url in self._handles
+
+    def dataset(self, url):
+        return _Checkout(self, url)
+
+    # Drop the handle of url, e.g. once the dataset is known to have changed.
+    # A handle in use is closed when it is released.
+    def discard(self, url):
+        with self._lock:
+            handle = self._handles.pop(url, None)
+            if handle is not None:
+                handle.closed = True
+                if handle.users == 0:
+                    handle.close()
+
+    def close(self):
+        with self._lock:
+            for handle in self._handles.values():
+                handle.closed = True
+                if handle.users == 0:
+                    handle.close()
+            self._handles.clear()
+
+    def _acquire(self, url):
+        while True:
+            with self._lock:
+                self._evict(url)
+                handle = self._handles.get(url)
+                if handle is None:
+                    handle = _Handle(url)
+                    self._handles[url] = handle
+                handle.users += 1
+            handle.lock.acquire()
+            if not handle.closed:
+                break
+            # Discarded while we were waiting for it.
+            handle.lock.release()
+            with self._lock:
+                handle.users -= 1
+        if handle.nc is None:
+            try:
+                handle.nc = self.opener(url)
+            except:
+                self._release(handle, True)
+                raise
+        return handle
+
+    def _release(self, handle, broken=False):
+        handle.last_used = time.time()
+        if broken:
+            with self._lock:
+                if self._handles.get(handle.url) is handle:
+                    del self._handles[handle.url]
+            handle.close()
+        elif handle.closed:
+            handle.close()
+        handle.lock.release()
+        with self._lock:
+            handle.users -= 1
+
+    def _evict(self, wanted):
+        # Called with self._lock held, before checking out `wanted`.
+        now = time.time()
+        idle = sorted((h.last_used, url) for url, h in self._handles.items()
+                      if h.users == 0)
+        for last_used, url in idle:
+            if now - last_used > self.idle_timeout:
+                self._handles.pop(url).close()
+            elif (not wanted in self._handles and
+                  len(self._handles) >= self.max_open):
+                self._handles.pop(url).close()
@@ -0,0 +1,976 @@
+#
+# The geojson web service: IOOS glider and ROMS drifter datasets (local files
+# or OPeNDAP urls) as GeoJSON, binary trajectories, encoded polylines and
+# vector tiles.
+#
+#     python geojsonservice.py
+#
+# The reading and writing of the files is in ioos_glider.py, which doesn't
+# depend on any of the web stack.
+#
+
+import numpy as np
+from datetime import datetime
+from netCDF4 import num2date, date2num
+from netCDF4 import Dataset
+import json
+import hashlib
+import zlib
+import multiprocessing
+import threading
+import time
+from flask import Flask, Response, request, abort, g, has_request_context, stream_with_context
+from werkzeug.datastructures import MultiDict
+import geojson as gj
+from getncattrs import __call__ as getncattrs
+from responsecache import ResponseCache
+from requestmetrics import RequestTimer, Metrics, NULL_TIMER
+from simplify import simplify, METHODS as SIMPLIFY_METHODS
+from coordjson import dumps_coords, encode_polyline, MAX_PRECISION
+from datasetpool import DatasetPool
+from vectortile import build_pyramid, encode_tile
+from catalog import Catalog, get_pieces
+import trajbin
+from ioos_glider import time_to_unix
+app = Flask(__name__)
+app.debug = True
+
+# Bounds of the in-process cache of rendered /geojson responses, and the age
+# in seconds after which a cached response is revalidated.
+GEOJSON_CACHE_ENTRIES = 128
+GEOJSON_CACHE_BYTES = 64 * 1024 * 1024
+GEOJSON_CACHE_TTL = 60.
+
+# Vertex budget per trajectory when /geojson is asked to simplify lines
+# without an explicit tolerance or vertex count.
+SIMPLIFY_VERTICES = 2000
+
+# Upper bound on the lon/lat slab read at once for multi-trajectory datasets.
+GEOJSON_BLOCK_BYTES = 64 * 1024 * 1024
+
+# Open remote datasets kept by the web service between requests (local files
+# are opened for every request), and the time in seconds after which an
+# unused one is closed.
+DATASET_POOL_MAX_OPEN = 16
+DATASET_POOL_IDLE_TIMEOUT = 300.
+
+# Worker processes rendering the datasets of a /geojson-batch request, the
+# most datasets accepted in one request and the time in seconds the datasets
+# of one request may take.
+BATCH_WORKERS = 4
+BATCH_MAX_DATASETS = 100
+BATCH_TIMEOUT = 120.
+
+# Compression level of gzip/deflate encoded responses, and the smallest body
+# worth compressing.
+COMPRESS_LEVEL = 6
+COMPRESS_MIN_BYTES = 1024
+
+# Number of datasets whose global attributes and time coverage are cached.
+METADATA_CACHE_ENTRIES = 1024
+
+# Vector tiles: the deepest zoom level of the simplified line pyramid (deeper
+# tiles are cut from it), and the bounds of the cache of pyramids.
+TILE_MAX_ZOOM = 14
+TILE_CACHE_ENTRIES = 32
+TILE_CACHE_BYTES = 256 * 1024 * 1024
+
+# The catalog of trajectories queried on /catalog/query: the file it is kept
+# in, the points per indexed piece of a trajectory (smaller pieces give fewer
+# false matches and a bigger index) and the vertices of the stored tracks.
+CATALOG_FILE = "catalog.json"
+CATALOG_PIECE_POINTS = 256
+CATALOG_VERTICES = 200
+
+# Whether responses carry a Server-Timing header with the time spent in each
+# phase of the request (streamed responses never do, their headers are sent
+# before the work is done).  The aggregated timings are served on /metrics
+# either way.
+SERVER_TIMING = True
+
+def get_time_name(nc):
+    tname = None
+    if "ocean_time" in nc.variables:
+        tname = "ocean_time"
+    if "time" in nc.variables:
+        tname = "time"
+    return tname
+
+# First and last time of the dataset, with one scalar read each.
+def get_time_coverage(nc):
+    a, b = None, None
+    tname = get_time_name(nc)
+    if tname != None and nc.variables[tname].shape[0] > 0:
+        tvar = nc.variables[tname]
+        calendar = getattr(tvar, "calendar", "standard")
+        a = num2date(tvar[0], units=tvar.units, calendar=calendar).strftime('%Y-%m-%d %H:%M UTC')
+        b = num2date(tvar[-1], units=tvar.units, calendar=calendar).strftime('%Y-%m-%d %H:%M UTC')
+    return a, b
+
+# Global attributes of the dataset, with time_coverage_start/end filled in
+# from the time coordinate when the dataset doesn't have them, and NumPy
+# values turned into plain (JSON serializable) ones.  Computed once per
+# dataset and cached until its date_modified changes.
+def get_metadata(nc):
+    key = (nc.filepath(),)
+    metadata = metadata_cache.get(key)
+    if metadata is None:
+        metadata = getncattrs(nc)
+        for k, v in metadata.items():
+            if isinstance(v, (np.ndarray, np.generic)):
+                metadata[k] = v.tolist()
+        if (not "time_coverage_start" in metadata) or (not "time_coverage_end" in metadata):
+            metadata["time_coverage_start"], metadata["time_coverage_end"] = get_time_coverage(nc)
+        metadata_cache.put(key, metadata, metadata.get("date_modified", None))
+    return metadata
+
+# Unix times of the rows of the dataset, NaN when it has no time coordinate.
+def get_unix_times(nc, rows):
+    tname = get_time_name(nc)
+    if tname is None:
+        return np.nan * np.ones(len(xrange(*rows.indices(nc.variables["lon"].shape[0]))))
+    tvar = nc.variables[tname]
+    return time_to_unix(tvar[rows], tvar.units, getattr(tvar, "calendar", "standard"))
+
+def get_stride(nc, size=None):
+    if size is None:
+        size = nc.variables["lon"].shape[0]
+    if size > 1000:
+        stride = 200
+    else:
+        stride = 1
+    return stride
+
+@app.route("/")
+def index():
+    response = \
+'''
+Here is what you do!!
+'''
+    return response
+
+@app.route("/geojson-line/<path:dap>")
+def geojson_line(dap):
+    return geojson(dap)
+
+def get_date_modified(nc):
+    if "date_modified" in nc.ncattrs():
+        return nc.getncattr("date_modified")
+    return None
+
+# Line simplification is requested with ?simplify=dp|vw plus an optional
+# tolerance (degrees) and/or vertex count per trajectory.  Simplified lines
+# are computed from the full resolution coordinates instead of the stride.
+def get_simplify_options(args):
+    method = args.get("simplify", None)
+    tolerance = args.get("tolerance", None, type=float)
+    vertices = args.get("vertices", None, type=int)
+    if method is None and tolerance is None and vertices is None:
+        return None
+    if method is None:
+        method = "dp"
+    if method not in SIMPLIFY_METHODS:
+        abort(400)
+    if tolerance is None and vertices is None:
+        vertices = SIMPLIFY_VERTICES
+    return method, tolerance, vertices
+
+def simplify_coords(lon, lat, options):
+    keep = simplify_index(lon, lat, options)
+    return lon[keep], lat[keep]
+
+def simplify_index(lon, lat, options):
+    if options is None:
+        return slice(None)
+    with get_timer().phase("simplify"):
+        return simplify(lon, lat, *options)
+
+# Index of the first value of a monotonically increasing variable that is
+# >= value (> value with right=True).  Only one value is read per step, so
+# over DAP this costs log2(n) scalar reads instead of the whole coordinate.
+def bisect_variable(var, value, right=False):
+    lo, hi = 0, var.shape[0]
+    while lo < hi:
+        mid = (lo + hi) // 2
+        v = var[mid]
+        if v < value or (right and v == value):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+# Range of time indices [i0, i1) between the start and end datetimes.
+def get_time_range(nc, start=None, end=None):
+    i0, i1 = 0, nc.variables["lon"].shape[0]
+    if start is None and end is None:
+        return i0, i1
+    tname = get_time_name(nc)
+    if tname is None:
+        abort(400)
+    tvar = nc.variables[tname]
+    calendar = getattr(tvar, "calendar", "standard")
+    if start is not None:
+        i0 = bisect_variable(tvar, date2num(start, units=tvar.units, calendar=calendar))
+    if end is not None:
+        i1 = bisect_variable(tvar, date2num(end, units=tvar.units, calendar=calendar), right=True)
+    return i0, max(i0, i1)
+
+# Data and validity mask of a lon/lat read: masked, fill (>= 1000) and
+# unpaired values are invalid, and so is anything outside the bbox (which may
+# cross the antimeridian, minlon > maxlon).
+def valid_coords(lon, lat, bbox=None):
+    valid = ~(np.ma.getmaskarray(lon) | np.ma.getmaskarray(lat))
+    lon = np.ma.getdata(lon).astype(np.float64)
+    lat = np.ma.getdata(lat).astype(np.float64)
+    valid &= (lon<1000) & (lat<1000)
+    if bbox is not None:
+        x0, y0, x1, y1 = bbox
+        if x0 <= x1:
+            valid &= (lon >= x0) & (lon <= x1)
+        else:
+            valid &= (lon >= x0) | (lon <= x1)
+        valid &= (lat >= y0) & (lat <= y1)
+    return lon, lat, valid
+
+# lon and lat at index, timed as the "read" phase.
+def read_coords(timer, lonvar, latvar, index):
+    with timer.phase("read"):
+        lon, lat = lonvar[index], latvar[index]
+    timer.add("bytes_read", lon.nbytes + lat.nbytes)
+    return lon, lat
+
+# Coordinates of (time, trajectory) datasets are read in column blocks of at
+# most GEOJSON_BLOCK_BYTES, so an ensemble costs one (or a few) DAP requests
+# per variable instead of two per trajectory.  Invalid values are dropped for
+# the whole block at once; yields the column index with the valid lon and lat
+# of each trajectory, and their positions within the rows read.
+def iter_trajectories(nc, rows, bbox=None):
+    lonvar, latvar = nc.variables["lon"], nc.variables["lat"]
+    nrows = len(xrange(*rows.indices(lonvar.shape[0])))
+    ncols = lonvar.shape[1]
+    step = max(1, GEOJSON_BLOCK_BYTES // max(1, nrows * 16))
+    timer = get_timer()
+    for c0 in xrange(0, ncols, step):
+        c1 = min(c0 + step, ncols)
+        lon, lat = read_coords(timer, lonvar, latvar, (rows, slice(c0, c1)))
+        with timer.phase("mask"):
+            lon, lat, valid = valid_coords(lon, lat, bbox)
+            # Transposed, the valid values come out grouped by trajectory.
+            valid = valid.T
+            bounds = np.cumsum(valid.sum(axis=1))[:-1]
+            lons = np.split(lon.T[valid], bounds)
+            lats = np.split(lat.T[valid], bounds)
+            index = np.split(np.broadcast_to(np.arange(nrows), valid.shape)[valid], bounds)
+        for j in xrange(c1 - c0):
+            yield c0 + j, lons[j], lats[j], index[j]
+
+# Options of a /geojson rendering, parsed (and rejected with a 400) before any
+# of the response is produced.
+def get_geojson_options(args):
+    return {"format": get_format(args),
+            "dtype": get_dtype(args),
+            "simplify": get_simplify_options(args),
+            "precision": get_precision(args),
+            "bbox": get_bbox(args),
+            "start": get_time_arg(args, "start"),
+            "end": get_time_arg(args, "end")}
+
+# ?format=geojson (default), bin (see trajbin.py) or polyline (a JSON list of
+# {"id": ..., "polyline": ...} with Google encoded polylines).
+RESPONSE_FORMATS = ("geojson", "bin", "polyline")
+
+def get_format(args):
+    format = args.get("format", "geojson")
+    if not format in RESPONSE_FORMATS:
+        abort(400)
+    return format
+
+# ?dtype=f4|f8, the type of the lon/lat values of format=bin.
+def get_dtype(args):
+    dtype = args.get("dtype", "f8")
+    if not dtype in ("f4", "f8"):
+        abort(400)
+    return dtype
+
+# ?bbox=minlon,minlat,maxlon,maxlat
+def get_bbox(args):
+    bbox = args.get("bbox", None)
+    if bbox is None:
+        return None
+    try:
+        bbox = tuple(float(v) for v in bbox.split(","))
+    except ValueError:
+        abort(400)
+    if len(bbox) != 4 or bbox[1] > bbox[3]:
+        abort(400)
+    return bbox
+
+# ?start= and ?end= take ISO 8601 UTC times, e.g. 2013-08-20 or
+# 2013-08-20T12:00:00Z.
+TIME_FORMATS = ("%Y-%m-%dT%H:%M:%SZ", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%dT%H:%MZ",
+                "%Y-%m-%dT%H:%M", "%Y-%m-%d %H:%M UTC", "%Y-%m-%d")
+
+def get_time_arg(args, name):
+    value = args.get(name, None)
+    if value is None:
+        return None
+    for fmt in TIME_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            pass
+    abort(400)
+
+# ?precision=N rounds coordinates to N decimals (5 is about 1 m); without it
+# the full float repr is written.
+def get_precision(args):
+    precision = args.get("precision", None, type=int)
+    if precision is not None and not 0 <= precision <= MAX_PRECISION:
+        abort(400)
+    return precision
+
+# Features are assembled as text so that the coordinates are written by
+# dumps_coords straight from the arrays.  The properties come already
+# serialized since all features of a dataset share them.
+def feature_json(id, lon, lat, properties, precision=None):
+    return '{"type": "Feature", "id": %s, "geometry": {"type": "LineString", "coordinates": %s}, "properties": %s}' % (
+        gj.dumps(id), dumps_coords(lon, lat, precision), properties)
+
+GEOJSON_COLLECTION_HEAD = '{"type": "FeatureCollection", "features": ['
+GEOJSON_COLLECTION_TAIL = ']}'
+
+# The features of a rendering as comma separated text, to splice renderings
+# of several datasets into one collection.
+def geojson_features(response):
+    if response.startswith(GEOJSON_COLLECTION_HEAD):
+        return response[len(GEOJSON_COLLECTION_HEAD):-len(GEOJSON_COLLECTION_TAIL)]
+    return response
+
+# Yields (id, lon, lat, index) of the valid coordinates of each trajectory in
+# the rows of the dataset, index being their positions within the rows: one
+# trajectory for glider (time) datasets, one per column for (time,
+# trajectory) datasets.
+def iter_dataset_trajectories(nc, rows=slice(None), bbox=None):
+    if len(nc.variables["lon"].shape) == 2:
+        ids = get_trajectory_ids(nc)
+        for i, lon, lat, index in iter_trajectories(nc, rows, bbox):
+            yield ids[i], lon, lat, index
+    else:
+        timer = get_timer()
+        lon, lat = read_coords(timer, nc.variables["lon"], nc.variables["lat"], rows)
+        with timer.phase("mask"):
+            lon, lat, valid = valid_coords(lon.flatten(), lat.flatten(), bbox)
+            lon, lat, index = lon[valid], lat[valid], np.flatnonzero(valid)
+        yield get_dataset_id(nc), lon, lat, index
+
+def get_trajectory_ids(nc):
+    if "trajectory" in nc.variables:
+        return np.ma.filled(nc.variables["trajectory"][:]).tolist()
+    return range(nc.variables["lon"].shape[1])
+
+def get_trajectory_count(nc):
+    if len(nc.variables["lon"].shape) == 2:
+        return nc.variables["lon"].shape[1]
+    return 1
+
+def get_dataset_id(nc):
+    if "id" in nc.ncattrs():
+        return nc.getncattr("id")
+    return None
+
+# A time window needs a time coordinate.  get_time_range() rejects it as
+# well, but a streamed response has to be checked before it is started, since
+# its 400 can't be sent once the rendering runs.
+def check_time_window(nc, options):
+    if (options["start"] is not None or options["end"] is not None) and get_time_name(nc) is None:
+        abort(400)
+
+# Whether the options subset the dataset.  Trajectories a subset leaves without
+# any points are left out of the JSON collections.
+def is_subset(options):
+    return options["bbox"] is not None or options["start"] is not None or options["end"] is not None
+
+# The rows to read for the time window of the options, and their stride.
+def get_rows(nc, options):
+    i0, i1 = get_time_range(nc, options["start"], options["end"])
+    if options["simplify"] is None:
+        stride = get_stride(nc, i1 - i0)
+    else:
+        stride = 1
+    return slice(i0, i1, stride), stride
+
+# Yields the GeoJSON text one feature at a time so that a streamed response
+# only ever holds a single trajectory in memory.
+def iter_geojson(nc, options):
+    timer = get_timer()
+    rows, stride = get_rows(nc, options)
+    trajectories = iter_dataset_trajectories(nc, rows, options["bbox"])
+    with timer.phase("metadata"):
+        s = gj.dumps(get_metadata(nc))
+    if len(nc.variables["lon"].shape) == 2:
+        yield GEOJSON_COLLECTION_HEAD
+        sep = ""
+        for id, lon, lat, _ in trajectories:
+            if len(lon) == 0 and is_subset(options):
+                continue
+            lon, lat = simplify_coords(lon, lat, options["simplify"])
+            yield sep + encode_feature(timer, id, lon, lat, s, options["precision"])
+            sep = ", "
+        yield GEOJSON_COLLECTION_TAIL
+    else:
+        id, lon, lat, _ = next(trajectories)
+        lon, lat = simplify_coords(lon, lat, options["simplify"])
+        yield encode_feature(timer, id, lon, lat, s, options["precision"])
+
+# feature_json(), timed as the "encode" phase and counted.
+def encode_feature(timer, id, lon, lat, properties, precision=None):
+    timer.add("trajectories")
+    timer.add("points", len(lon))
+    with timer.phase("encode"):
+        return feature_json(id, lon, lat, properties, precision)
+
+# format=bin, one trajectory at a time.  Every trajectory of the dataset is
+# written (possibly empty) so that the count in the header is known upfront.
+def iter_binary(nc, options):
+    timer = get_timer()
+    rows, stride = get_rows(nc, options)
+    with timer.phase("read"):
+        times = get_unix_times(nc, rows)
+    yield trajbin.pack_header(get_trajectory_count(nc), options["dtype"])
+    for id, lon, lat, index in iter_dataset_trajectories(nc, rows, options["bbox"]):
+        keep = simplify_index(lon, lat, options["simplify"])
+        timer.add("trajectories")
+        timer.add("points", len(lon[keep]))
+        with timer.phase("encode"):
+            data = trajbin.pack_trajectory(id, lon[keep], lat[keep], times[index[keep]], options["dtype"])
+        yield data
+
+def iter_polyline(nc, options):
+    timer = get_timer()
+    rows, stride = get_rows(nc, options)
+    precision = options["precision"]
+    if precision is None:
+        precision = 5
+    yield "["
+    sep = ""
+    for id, lon, lat, _ in iter_dataset_trajectories(nc, rows, options["bbox"]):
+        if len(lon) == 0 and is_subset(options):
+            continue
+        lon, lat = simplify_coords(lon, lat, options["simplify"])
+        timer.add("trajectories")
+        timer.add("points", len(lon))
+        with timer.phase("encode"):
+            data = '{"id": %s, "polyline": %s}' % (gj.dumps(id), json.dumps(encode_polyline(lon, lat, precision)))
+        yield sep + data
+        sep = ", "
+    yield "]"
+
+RENDERERS = {"geojson": (iter_geojson, "application/json"),
+             "bin": (iter_binary, "application/octet-stream"),
+             "polyline": (iter_polyline, "application/json")}
+
+def iter_rendering(nc, options):
+    return RENDERERS[options["format"]][0](nc, options)
+
+def get_mimetype(options):
+    return RENDERERS[options["format"]][1]
+
+def render_dataset(nc, options):
+    return "".join(iter_rendering(nc, options))
+
+# The jsonp callback only applies to the JSON formats.  A streamed response
+# renders from a handle of its own, closed when it is done: it runs as fast as
+# its client reads, and a pooled handle would be locked, holding up every
+# other request for the dataset, for as long as that takes.
+def stream_dataset(nc, options, callback=None):
+    try:
+        if callback != None:
+            yield callback + "("
+        for chunk in iter_rendering(nc, options):
+            yield chunk
+        if callback != None:
+            yield ")"
+    finally:
+        nc.close()
+
+# Opening a dataset (for DAP urls, fetching its metadata) is the "open" phase
+# of the request that needs it.
+def open_dataset(url):
+    with get_timer().phase("open"):
+        return Dataset(url)
+
+dataset_pool = DatasetPool(max_open=DATASET_POOL_MAX_OPEN,
+                           idle_timeout=DATASET_POOL_IDLE_TIMEOUT,
+                           opener=open_dataset)
+
+# Cached renderings are revalidated against the dataset's date_modified
+# attribute once they are older than GEOJSON_CACHE_TTL seconds.  Datasets
+# without date_modified are simply rendered again.  A pooled handle only knows
+# the attributes from when it was opened, so this opens the dataset afresh and
+# drops the pooled handle when the dataset has changed.
+def revalidate_dataset(key, date_modified):
+    if date_modified is None:
+        return False
+    with Dataset(key[0]) as nc:
+        valid = get_date_modified(nc) == date_modified
+    if not valid:
+        dataset_pool.discard(key[0])
+    return valid
+
+geojson_cache = ResponseCache(max_entries=GEOJSON_CACHE_ENTRIES,
+                              max_bytes=GEOJSON_CACHE_BYTES,
+                              ttl=GEOJSON_CACHE_TTL,
+                              revalidate=revalidate_dataset)
+
+# The stride is a function of the dataset alone, so the DAP url and the query
+# parameters identify a rendering.  The jsonp callback and the stream switch
+# don't change the body and are left out so that all callers share one entry.
+GEOJSON_UNCACHED_ARGS = ("callback", "stream")
+
+def geojson_cache_key(dap, args):
+    params = tuple(sorted((k, tuple(args.getlist(k))) for k in args if not k in GEOJSON_UNCACHED_ARGS))
+    return (dap, params)
+
+# HTTP dates for Last-Modified, from date_modified as written by writer_0_0()
+# (time.ctime()) or as ISO 8601.
+DATE_MODIFIED_FORMATS = ("%a %b %d %H:%M:%S %Y", "%Y-%m-%dT%H:%M:%SZ",
+                         "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+def parse_date_modified(value):
+    if value is None:
+        return None
+    for fmt in DATE_MODIFIED_FORMATS:
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            pass
+    return None
+
+def to_bytes(body):
+    if isinstance(body, unicode):
+        return body.encode("utf-8")
+    return body
+
+# gzip or deflate, whichever the client prefers, or None.
+def get_content_encoding():
+    return request.accept_encodings.best_match(["gzip", "deflate"], default=None)
+
+def compressor(encoding):
+    # wbits 31 writes the gzip container, 15 the zlib one HTTP calls deflate.
+    wbits = 31 if encoding == "gzip" else 15
+    return zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+
+def compress(body, encoding):
+    with get_timer().phase("compress"):
+        z = compressor(encoding)
+        return z.compress(to_bytes(body)) + z.flush()
+
+def compress_stream(chunks, encoding):
+    timer = get_timer()
+    z = compressor(encoding)
+    for chunk in chunks:
+        with timer.phase("compress"):
+            data = z.compress(to_bytes(chunk))
+        if data:
+            yield data
+    yield z.flush()
+
+# The ETag of a rendering follows from what was asked for (the cache key and
+# callback) and the date_modified of the dataset it was rendered from.
+# Datasets without date_modified fall back to a hash of the body.
+def make_etag(key, callback, date_modified, body):
+    if date_modified is None:
+        return hashlib.sha1(to_bytes(body)).hexdigest()
+    return hashlib.sha1(to_bytes(repr((key, callback, date_modified)))).hexdigest()
+
+# Response with ETag and Last-Modified that answers conditional requests with
+# a 304, and is gzip/deflate encoded when the client accepts it.  Encoded
+# bodies are cached next to the plain ones under key and the ETag, so a
+# rendering of a changed dataset never gets the encoded body of the old one.
+def conditional_response(body, mimetype, key, callback, date_modified):
+    encoding = get_content_encoding()
+    if len(body) < COMPRESS_MIN_BYTES:
+        encoding = None
+    etag = make_etag(key, callback, date_modified, body)
+    if encoding is not None:
+        etag += "-" + encoding
+    response = Response(body, mimetype=mimetype)
+    response.set_etag(etag)
+    last_modified = parse_date_modified(date_modified)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.vary.add("Accept-Encoding")
+    response.make_conditional(request)
+    if response.status_code == 304 or encoding is None:
+        return response
+    ckey = key + (("encoding", etag),)
+    data = geojson_cache.get(ckey)
+    if data is None:
+        data = compress(body, encoding)
+        geojson_cache.put(ckey, data, date_modified)
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+    return response
+
+# With ?stream=true a response that isn't cached yet is sent as it is
+# rendered, and not cached, instead of being built in memory first.
+@app.route("/geojson/<path:dap>")
+def geojson(dap):
+    callback = request.args.get('callback', None)
+    options = get_geojson_options(request.args)
+    if options["format"] == "bin":
+        callback = None
+    key = geojson_cache_key(dap, request.args)
+    with g.timer.phase("cache"):
+        response, date_modified = geojson_cache.lookup(key)
+    if response is None and request.args.get('stream', 'false').lower() in ('1', 'true', 'yes'):
+        nc = open_dataset(dap)
+        try:
+            check_time_window(nc, options)
+        except:
+            nc.close()
+            raise
+        chunks = stream_dataset(nc, options, callback)
+        encoding = get_content_encoding()
+        if encoding is not None:
+            chunks = compress_stream(chunks, encoding)
+        chunks = record_stream(chunks, g.timer, request.endpoint)
+        g.streamed = True
+        response = Response(stream_with_context(chunks), mimetype=get_mimetype(options))
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        return response
+    if response is None:
+        with dataset_pool.dataset(dap) as nc:
+            # Requests that waited for the handle while another one rendered
+            # the same response use its rendering.
+            response, date_modified = geojson_cache.lookup(key)
+            if response is None:
+                response = render_dataset(nc, options)
+                date_modified = get_date_modified(nc)
+                geojson_cache.put(key, response, date_modified)
+    if callback != None:
+        response = callback + "(" + response + ")"
+    return conditional_response(response, get_mimetype(options), key, callback, date_modified)
+
+batch_pool = None
+batch_pool_lock = threading.Lock()
+
+# The batch workers are forked from the server.  Forked while other threads
+# serve requests they would inherit the locks those threads hold (e.g. those
+# of HDF5 and netCDF), so there is one pool for the life of the service,
+# started before serving (see __main__), and requests never start one.
+def start_batch_pool():
+    global batch_pool
+    with batch_pool_lock:
+        if batch_pool is None:
+            batch_pool = multiprocessing.Pool(BATCH_WORKERS, initializer=init_batch_worker)
+        return batch_pool
+
+def init_batch_worker():
+    global metadata_cache
+    metadata_cache = make_metadata_cache()
+
+def get_batch_pool():
+    if batch_pool is None:
+        abort(503)
+    return batch_pool
+
+# Yields (url, result) for the (url, AsyncResult) of the tasks of one batch
+# request, result None for the tasks not done within BATCH_TIMEOUT of the
+# start of the batch.  Tasks can't be cancelled: a timed out one keeps its
+# worker until it is done, and its result is dropped.
+def get_batch_results(pending):
+    deadline = time.time() + BATCH_TIMEOUT
+    for dap, result in pending:
+        try:
+            yield dap, result.get(max(0., deadline - time.time()))
+        except multiprocessing.TimeoutError:
+            yield dap, None
+
+# Runs in a batch worker process.  Pooled handles can't be shared between
+# processes, so the dataset is opened afresh; failures are returned rather
+# than raised so that one bad dataset doesn't fail the whole batch.
+def render_batch_item(dap, options):
+    try:
+        with Dataset(dap) as nc:
+            return render_dataset(nc, options), get_date_modified(nc), None
+    except Exception as e:
+        return None, None, "%s: %s" % (type(e).__name__, e)
+
+# The body of a batch request is a JSON list of DAP urls, or an object
+#     {"datasets": [url, ...], "options": {"precision": 5, ...}}
+# where the options are those of /geojson (they may also be given in the
+# query string).
+def get_batch_request():
+    body = request.get_json(force=True, silent=True)
+    args = MultiDict(request.args)
+    if isinstance(body, dict):
+        for k, v in (body.get("options") or {}).items():
+            if isinstance(v, list):
+                v = ",".join(str(x) for x in v)
+            args[k] = str(v)
+        body = body.get("datasets")
+    if (not isinstance(body, list) or not 0 < len(body) <= BATCH_MAX_DATASETS or
+        not all(isinstance(dap, basestring) for dap in body)):
+        abort(400)
+    urls = []
+    for dap in body:
+        if not dap in urls:
+            urls.append(dap)
+    return urls, args
+
+# Renders many datasets into one FeatureCollection.  Cached renderings are
+# used as they are, the rest are rendered concurrently by the batch workers
+# and cached.  Datasets that fail are listed under "errors" as
+# {"dataset": url, "error": message}.
+@app.route("/geojson-batch", methods=["POST"])
+def geojson_batch():
+    urls, args = get_batch_request()
+    callback = args.get('callback', None)
+    options = get_geojson_options(args)
+    if options["format"] != "geojson":
+        abort(400)
+    responses, errors, pending = {}, [], []
+    pool = get_batch_pool()
+    for dap in urls:
+        responses[dap] = geojson_cache.get(geojson_cache_key(dap, args))
+        if responses[dap] is None:
+            pending.append((dap, pool.apply_async(render_batch_item, (dap, options))))
+    for dap, result in get_batch_results(pending):
+        response, date_modified, error = result or (None, None, "Timed out")
+        if error is None:
+            geojson_cache.put(geojson_cache_key(dap, args), response, date_modified)
+            responses[dap] = response
+        else:
+            errors.append({"dataset": dap, "error": error})
+    features = [geojson_features(responses[dap]) for dap in urls if responses[dap]]
+    response = GEOJSON_COLLECTION_HEAD + ", ".join(f for f in features if f) + \
+        GEOJSON_COLLECTION_TAIL[:-1] + ', "errors": ' + json.dumps(errors) + "}"
+    if callback != None:
+        response = callback + "(" + response + ")"
+    return Response(response, mimetype='application/json')
+
+def make_metadata_cache():
+    return ResponseCache(max_entries=METADATA_CACHE_ENTRIES,
+                         max_bytes=GEOJSON_CACHE_BYTES,
+                         ttl=GEOJSON_CACHE_TTL,
+                         revalidate=revalidate_dataset,
+                         sizeof=lambda metadata: len(gj.dumps(metadata)))
+
+metadata_cache = make_metadata_cache()
+
+# Global attributes and time coverage of a dataset, without reading any of
+# its coordinates.
+@app.route("/metadata/<path:dap>")
+def metadata(dap):
+    callback = request.args.get('callback', None)
+    with dataset_pool.dataset(dap) as nc:
+        with g.timer.phase("metadata"):
+            response = gj.dumps(get_metadata(nc))
+    if callback != None:
+        response = callback + "(" + response + ")"
+    return Response(response, mimetype='application/json')
+
+pyramid_cache = ResponseCache(max_entries=TILE_CACHE_ENTRIES,
+                              max_bytes=TILE_CACHE_BYTES,
+                              ttl=GEOJSON_CACHE_TTL,
+                              revalidate=revalidate_dataset,
+                              sizeof=lambda pyramid: pyramid.nbytes)
+
+# Locks of the pyramids being built, by cache key.
+pyramid_builds = {}
+pyramid_builds_lock = threading.Lock()
+
+# The simplified line pyramid of a dataset is built from its full resolution
+# coordinates on the first tile request and cached for the following ones.
+# A map asks for many tiles at once; one of those requests builds the pyramid
+# while the others wait for it, for local files (which aren't pooled) too.
+def get_pyramid(dap):
+    key = (dap,)
+    pyramid = pyramid_cache.get(key)
+    if pyramid is not None:
+        return pyramid
+    with pyramid_builds_lock:
+        build = pyramid_builds.setdefault(key, threading.Lock())
+    try:
+        with build:
+            pyramid = pyramid_cache.get(key)
+            if pyramid is None:
+                with dataset_pool.dataset(dap) as nc:
+                    trajectories = ((id, lon, lat) for id, lon, lat, _ in iter_dataset_trajectories(nc))
+                    with get_timer().phase("simplify"):
+                        pyramid = build_pyramid(trajectories, TILE_MAX_ZOOM)
+                    pyramid_cache.put(key, pyramid, get_date_modified(nc))
+    finally:
+        # Requests arriving after this find the pyramid in the cache (or
+        # start a build of their own if it failed or was too large to cache).
+        with pyramid_builds_lock:
+            if pyramid_builds.get(key) is build:
+                del pyramid_builds[key]
+    return pyramid
+
+@app.route("/tiles/<int:z>/<int:x>/<int:y>/<path:dap>")
+def tiles(z, x, y, dap):
+    if z > 30 or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        abort(404)
+    pyramid = get_pyramid(dap)
+    with g.timer.phase("encode"):
+        tile = encode_tile(pyramid, z, x, y)
+    return Response(tile, mimetype='application/vnd.mapbox-vector-tile')
+
+dataset_catalog = Catalog(CATALOG_FILE)
+
+def iso_time(t):
+    if t is None:
+        return None
+    return datetime.utcfromtimestamp(t).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+def catalog_trajectory(id, lon, lat, times):
+    valid = times[np.isfinite(times)]
+    keep = simplify(lon, lat, "dp", vertices=CATALOG_VERTICES)
+    return {"id": id,
+            "start": float(valid.min()) if len(valid) else None,
+            "end": float(valid.max()) if len(valid) else None,
+            "bbox": [float(lon.min()), float(lat.min()), float(lon.max()), float(lat.max())]
+                    if len(lon) else None,
+            "pieces": get_pieces(lon, lat, times, CATALOG_PIECE_POINTS),
+            "lon": lon[keep].tolist(),
+            "lat": lat[keep].tolist(),
+            "time": [None if np.isnan(t) else float(t) for t in times[keep]]}
+
+# Runs in a batch worker process.  The catalog entry of a dataset, or None
+# when its date_modified is still date_modified; failures are returned like
+# in render_batch_item().
+def catalog_entry(dap, date_modified=None):
+    try:
+        with Dataset(dap) as nc:
+            if date_modified is not None and get_date_modified(nc) == date_modified:
+                return None, None
+            times = np.ma.filled(np.ma.asarray(get_unix_times(nc, slice(None)), np.float64), np.nan)
+            trajectories = [catalog_trajectory(id, lon, lat, times[index])
+                            for id, lon, lat, index in iter_dataset_trajectories(nc)]
+            return {"date_modified": get_date_modified(nc),
+                    "ingested": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                    "trajectories": trajectories}, None
+    except Exception as e:
+        return None, "%s: %s" % (type(e).__name__, e)
+
+# Adds datasets to the catalog, the body being that of /geojson-batch.  The
+# datasets are read by the batch workers; datasets whose date_modified hasn't
+# changed since they were ingested are skipped unless ?force=true.  Reports
+# {"ingested": [url, ...], "unchanged": [url, ...], "errors": [...]}.
+@app.route("/catalog", methods=["POST"])
+def catalog_ingest():
+    urls, args = get_batch_request()
+    force = args.get('force', 'false').lower() in ('1', 'true', 'yes')
+    pending = []
+    pool = get_batch_pool()
+    for dap in urls:
+        entry = dataset_catalog.get(dap)
+        date_modified = entry["date_modified"] if entry is not None and not force else None
+        pending.append((dap, pool.apply_async(catalog_entry, (dap, date_modified))))
+    report = {"ingested": [], "unchanged": [], "errors": []}
+    for dap, result in get_batch_results(pending):
+        entry, error = result or (None, "Timed out")
+        if error is not None:
+            report["errors"].append({"dataset": dap, "error": error})
+        elif entry is None:
+            report["unchanged"].append(dap)
+        else:
+            dataset_catalog.put(dap, entry)
+            report["ingested"].append(dap)
+    if report["ingested"]:
+        dataset_catalog.save()
+    return Response(json.dumps(report), mimetype='application/json')
+
+# The datasets of the catalog, without their trajectories.
+@app.route("/catalog")
+def catalog_list():
+    callback = request.args.get('callback', None)
+    datasets = []
+    for dap in sorted(dataset_catalog.datasets):
+        entry = dataset_catalog.get(dap)
+        datasets.append({"dataset": dap,
+                         "date_modified": entry["date_modified"],
+                         "ingested": entry["ingested"],
+                         "trajectories": len(entry["trajectories"])})
+    response = json.dumps({"datasets": datasets})
+    if callback != None:
+        response = callback + "(" + response + ")"
+    return Response(response, mimetype='application/json')
+
+# The catalogued trajectories that passed through ?bbox= between ?start= and
+# ?end= (same arguments as /geojson, all optional), as a FeatureCollection of
+# their simplified tracks.  Only the index is searched, no dataset is opened.
+@app.route("/catalog/query")
+def catalog_query():
+    callback = request.args.get('callback', None)
+    bbox = get_bbox(request.args)
+    start = get_time_arg(request.args, "start")
+    end = get_time_arg(request.args, "end")
+    precision = get_precision(request.args)
+    epoch = datetime(1970, 1, 1)
+    with g.timer.phase("query"):
+        matches = dataset_catalog.query(bbox,
+                                        None if start is None else (start - epoch).total_seconds(),
+                                        None if end is None else (end - epoch).total_seconds())
+    features = []
+    for dap, trajectory in matches:
+        properties = json.dumps({"dataset": dap,
+                                 "start": iso_time(trajectory["start"]),
+                                 "end": iso_time(trajectory["end"]),
+                                 "bbox": trajectory["bbox"]})
+        features.append(encode_feature(g.timer, trajectory["id"], np.array(trajectory["lon"]),
+                                       np.array(trajectory["lat"]), properties, precision))
+    response = GEOJSON_COLLECTION_HEAD + ", ".join(features) + GEOJSON_COLLECTION_TAIL
+    if callback != None:
+        response = callback + "(" + response + ")"
+    return Response(response, mimetype='application/json')
+
+request_metrics = Metrics()
+
+# The timer of the current request, or one that records nothing outside of
+# requests (e.g. in batch workers and conversions).
+def get_timer():
+    if has_request_context():
+        return getattr(g, "timer", NULL_TIMER)
+    return NULL_TIMER
+
+@app.before_request
+def start_timer():
+    g.timer = RequestTimer()
+
+# Streamed responses are recorded by record_stream() once they are sent.
+@app.after_request
+def record_timer(response):
+    timer = getattr(g, "timer", None)
+    if timer is None or getattr(g, "streamed", False):
+        return response
+    timer.add("bytes_returned", response.content_length or 0)
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timer.server_timing()
+    request_metrics.record(request.endpoint, response.status_code, timer)
+    return response
+
+def record_stream(chunks, timer, endpoint):
+    try:
+        for chunk in chunks:
+            timer.add("bytes_returned", len(chunk))
+            yield chunk
+    finally:
+        request_metrics.record(endpoint, 200, timer)
+
+# Request and phase durations, response sizes and counts (bytes read from
+# the datasets, trajectories and points returned) by endpoint, in the
+# Prometheus text format.  The phases are open, cache, metadata, read, mask,
+# simplify, encode, compress and query (the catalog search).
+@app.route("/metrics")
+def metrics():
+    return Response(request_metrics.render(), mimetype='text/plain; version=0.0.4')
+
+if __name__ == '__main__':
+    start_batch_pool()
+    app.run()
+    #app.run('0.0.0.0')
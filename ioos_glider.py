@@ -67,92 +67,201 @@ from netCDF4 import default_fillvals as NC_FILL_VALUES
 from netCDF4 import num2date, date2num
 from netCDF4 import Dataset
 import time as t
-from flask import Flask, Response, request
-import geojson as gj
-from getncattrs import __call__ as getncattrs
-app = Flask(__name__)
-app.debug = True
+import json
+import multiprocessing
+import os
+import tempfile
+from coveragestats import CoverageStats
 
 # NetCDF4 compression level (1 seems to be optimal, in terms of effort and
 # result)
 COMP_LEVEL = 1
 
+# Size of the chunks laid out by a storage profile (see STORAGE_PROFILES), and
+# of the chunks along the unlimited time dimension of files written in blocks.
+CHUNK_BYTES = 1024 * 1024
+
+# Upper bound on the slab of one variable read at once when converting ROMS
+# drifter simulations.
+ROMSSIM_BLOCK_BYTES = 64 * 1024 * 1024
+
+# Time units that are a fixed number of seconds.  Between two such units and
+# compatible calendars (the same one, or two that agree on the Gregorian
+# calendar since 1582) numeric times convert with one offset and scale
+# instead of going through arrays of datetime objects.
+TIME_UNIT_SECONDS = {"seconds": 1., "second": 1., "secs": 1., "sec": 1., "s": 1.,
+                     "minutes": 60., "minute": 60., "mins": 60., "min": 60.,
+                     "hours": 3600., "hour": 3600., "hrs": 3600., "hr": 3600., "h": 3600.,
+                     "days": 86400., "day": 86400., "d": 86400.}
+STANDARD_CALENDARS = ("standard", "gregorian", "proleptic_gregorian")
+UNIX_UNITS = "seconds since 1970-01-01 00:00:00"
+
+def get_unit_seconds(units):
+    return TIME_UNIT_SECONDS.get(units.partition(" since ")[0].strip().lower())
+
+def is_compatible_calendar(calendar, to_calendar):
+    calendar, to_calendar = calendar.lower(), to_calendar.lower()
+    return calendar == to_calendar or (calendar in STANDARD_CALENDARS and
+                                       to_calendar in STANDARD_CALENDARS)
+
+# Numeric times in units and calendar rescaled to to_units and to_calendar;
+# masked values become NaN.  Falls back to datetime objects when the units
+# or the calendars aren't compatible (NaN can't be converted to a date, so
+# the masked values stay masked until the end there).
+def convert_time(values, units, calendar, to_units, to_calendar):
+    values = np.ma.asarray(values, np.float64)
+    calendar, to_calendar = calendar or "standard", to_calendar or "standard"
+    scale, to_scale = get_unit_seconds(units), get_unit_seconds(to_units)
+    if scale is not None and to_scale is not None and is_compatible_calendar(calendar, to_calendar):
+        # The epoch of to_units, in units.
+        offset = date2num(num2date(0., units=to_units, calendar=calendar),
+                          units=units, calendar=calendar)
+        return (np.ma.filled(values, np.nan) - offset) * (scale / to_scale)
+    times = date2num(num2date(values, units=units, calendar=calendar),
+                     units=to_units, calendar=to_calendar)
+    return np.ma.filled(np.ma.asarray(times, np.float64), np.nan)
+
+def time_to_unix(values, units, calendar="standard"):
+    return convert_time(values, units, calendar, UNIX_UNITS, calendar)
+
+# Fields of a ROMS drifter simulation (as returned by romssim_read()) and the
+# netCDF variables they come from.
+ROMSSIM_VARIABLES = {"lon":"lon", "lat":"lat", "depth":"depth",
+                     "dens":"rho", "temp":"temp", "salt":"salt"}
+
+# Lazy view of a ROMS drifter simulation.  Nothing is read until blocks() or
+# read() is called, and then only the requested (time, drifter) block:
+#
+#     with RomsSim(filename) as roms:
+#         for times, drifters, block in roms.blocks(time_block=1000):
+#             ...
+#
+# block has the keys of romssim_read(); "time" and "datetime" only cover the
+# time steps of the block.  "time" is in time_units and time_calendar; with
+# datetimes=False the "datetime" objects aren't created at all.
+class RomsSim(object):
+
+    def __init__(self, filename):
+        self.nc = Dataset(filename)
+        self.shape = self.nc.variables["lon"].shape
+        ocean_time = self.nc.variables["ocean_time"]
+        self.time_units = ocean_time.units
+        self.time_calendar = getattr(ocean_time, "calendar", "standard")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def close(self):
+        self.nc.close()
+
+    # Number of time steps per block that keeps a block of one variable
+    # within ROMSSIM_BLOCK_BYTES.
+    def get_time_block(self, drifter_block=None):
+        itemsize = max(self.nc.variables[name].dtype.itemsize
+                       for name in ROMSSIM_VARIABLES.values())
+        ndrifters = drifter_block or self.shape[1]
+        return max(1, ROMSSIM_BLOCK_BYTES // (itemsize * ndrifters))
+
+    def read(self, times=slice(None), drifters=slice(None), datetimes=True):
+        vars = self.nc.variables
+        response = dict((key, vars[name][times, drifters])
+                        for key, name in ROMSSIM_VARIABLES.items())
+        response["time"] = vars["ocean_time"][times]
+        if datetimes:
+            response["datetime"] = num2date(response["time"], units=self.time_units,
+                                            calendar=self.time_calendar)
+        return response
+
+    # Yields (times, drifters, block) for consecutive blocks of time_block
+    # time steps (by default as many as ROMSSIM_BLOCK_BYTES allows) and
+    # drifter_block drifters (by default all of them), time blocks outermost.
+    # times and drifters restrict the blocks to a range of the simulation.
+    def blocks(self, time_block=None, drifter_block=None,
+               times=slice(None), drifters=slice(None), datetimes=True):
+        time_start, time_stop, _ = times.indices(self.shape[0])
+        drifter_start, drifter_stop, _ = drifters.indices(self.shape[1])
+        drifter_block = drifter_block or max(1, drifter_stop - drifter_start)
+        time_block = time_block or self.get_time_block(drifter_block)
+        for i in xrange(time_start, time_stop, time_block):
+            block_times = slice(i, min(i + time_block, time_stop))
+            for j in xrange(drifter_start, drifter_stop, drifter_block):
+                block_drifters = slice(j, min(j + drifter_block, drifter_stop))
+                yield block_times, block_drifters, self.read(block_times, block_drifters, datetimes)
+
 def romssim_read(filename):
-    with Dataset(filename) as nc:
-        vars = nc.variables
-        lon = vars["lon"][:]
-        lat = vars["lat"][:]
-        depth = vars["depth"][:]
-        dens = vars["rho"][:]
-        temp = vars["temp"][:]
-        salt = vars["salt"][:]
-        time = vars["ocean_time"][:]
-        datetime = num2date(time, units=vars["ocean_time"].units)
-    response = {"lon":lon, "lat":lat, "depth":depth,
-                "dens":dens, "temp":temp, "salt":salt,
-                "time":time, "datetime":datetime}
-    return response
+    with RomsSim(filename) as roms:
+        return roms.read()
 
-def romssim_write(filename, output, ver="0.0"):
+# Converts a ROMS drifter simulation, time_block time steps at a time (by
+# default as many as ROMSSIM_BLOCK_BYTES allows), so that memory use doesn't
+# grow with the length of the simulation.  times and drifters (slices)
+# convert only part of the simulation; trajectory ids stay the drifter
+# indices of the whole simulation.  profile is the storage profile of the
+# output (see STORAGE_PROFILES).
+def romssim_write(filename, output, ver="0.0", time_block=None,
+                  times=slice(None), drifters=slice(None), profile=None):
     processing_level = ""
     source = ""
-    roms = romssim_read(filename)
     if ver=="0.0":
-        dummy = np.ones_like(roms["lon"]) * np.nan
-        dummyuv = np.ones((1,roms["lon"].shape[1])) * np.nan
-        dummytimeuv = np.ndarray((1,), dtype=type(roms["datetime"][0]))
-        dummytimeuv[:] = roms["datetime"][0]
-        traj = np.arange(roms["lon"].shape[1])
-        writer_0_0(output, roms["datetime"], dummytimeuv, traj, dummy, dummy, roms["depth"], roms["lat"], roms["lon"], dummy, dummy, roms["dens"], roms["salt"], roms["temp"], dummyuv, dummyuv, dummyuv, dummyuv, processing_level=processing_level, source=source)
+        with RomsSim(filename) as roms:
+            # Times stay numeric, the writer rescales them to its units.
+            time_start = times.indices(roms.shape[0])[0]
+            dummytimeuv = roms.nc.variables["ocean_time"][time_start:time_start + 1]
+            time_size = len(xrange(*times.indices(roms.shape[0])))
+            traj = np.arange(*drifters.indices(roms.shape[1]))
+            with GliderWriter_0_0(output, dummytimeuv, traj, None, None, None, None, profile=profile,
+                                  time_size=time_size,
+                                  time_units=roms.time_units, time_calendar=roms.time_calendar,
+                                  processing_level=processing_level, source=source) as writer:
+                for block_times, block_drifters, block in roms.blocks(time_block, times=times, drifters=drifters, datetimes=False):
+                    writer.append(block["time"], None, None, block["depth"], block["lat"], block["lon"], None, None, block["dens"], block["salt"], block["temp"])
 
-def writer_0_0(filename, timedata, time_uvdata, trajectorydata, segment_iddata,
-               profile_iddata, depthdata, latdata, londata, pressuredata, 
-               conductivitydata, densitydata, salinitydata, temperaturedata, udata, vdata, 
-               lat_uvdata, lon_uvdata, time_qcdata=None, u_qcdata=None, v_qcdata=None,
-               depth_qcdata=None, lat_qcdata=None, lon_qcdata=None, pressure_qcdata=None,
-               conductivity_qcdata=None, density_qcdata=None, salinity_qcdata=None,
-               temperature_qcdata=None, **kwargs):
-    # Name of output file (leave v.0.0 pending release of accepted spec):
-    # kerfoot@marine.rutgers.edu
-    nc = Dataset(filename,
-                 'w',
-                 format='NETCDF4_CLASSIC')
+# Runs in a conversion worker process; args are those of romssim_write().
+def romssim_write_shard(args):
+    filename, output, ver, time_block, times, drifters, profile = args
+    romssim_write(filename, output, ver, time_block, times, drifters, profile)
+    return output
 
-    now = t.ctime(t.time())
+# Converts a ROMS drifter simulation with a pool of `workers` processes (by
+# default one per core).  The simulation is split into shards of shard_size
+# drifters, or time steps with by="time" (by default one shard per worker),
+# and every shard is written to a complete IOOS glider file of its own, named
+# after output with the shard number appended (run_0000.nc, run_0001.nc, ...
+# for run.nc).  Returns the names of the files, in shard order.
+def romssim_write_parallel(filename, output, ver="0.0", by="drifter",
+                           shard_size=None, workers=None, time_block=None,
+                           profile=None):
+    if by not in ("drifter", "time"):
+        raise ValueError("by must be 'drifter' or 'time', not %r" % (by,))
+    workers = workers or multiprocessing.cpu_count()
+    # Only the shape is needed here; the workers open the file themselves.
+    with RomsSim(filename) as roms:
+        size = roms.shape[1] if by == "drifter" else roms.shape[0]
+    shard_size = shard_size or max(1, -(-size // workers))
+    root, ext = os.path.splitext(output)
+    shards = []
+    for n, i in enumerate(xrange(0, size, shard_size)):
+        part = slice(i, min(i + shard_size, size))
+        times, drifters = (slice(None), part) if by == "drifter" else (part, slice(None))
+        shards.append((filename, "%s_%04d%s" % (root, n, ext), ver, time_block, times, drifters, profile))
+    pool = multiprocessing.Pool(max(1, min(workers, len(shards))))
+    try:
+        outputs = pool.map(romssim_write_shard, shards, chunksize=1)
+    finally:
+        pool.terminate()
+        pool.join()
+    return outputs
 
-    # Required vars list
-    req_time_vars = [depthdata, latdata, londata, pressuredata, conductivitydata, densitydata, salinitydata, temperaturedata,]
-    req_uv_vars = [udata, vdata, lat_uvdata, lon_uvdata]
-    #req_traj_vars = req_time_vars + req_uv_vars
-    quality_vars = [depth_qcdata, lat_qcdata, lon_qcdata, pressure_qcdata, conductivity_qcdata, density_qcdata, salinity_qcdata, temperature_qcdata]
-    for var in quality_vars:
-        if var != None:
-            req_time_vars.append(var)
-            #req_traj_vars.append(var)
-
-    # Dimensions
-    time_size = len(timedata)
-    trajectory_size = len(trajectorydata)
-    time_uv_size = len(time_uvdata)
-    for var in req_time_vars:
-        assert time_size == var.shape[0]
-    #for var in req_traj_vars:
-    #    assert trajectory_size == var.shape[1]
-    for var in req_uv_vars:
-        assert time_uv_size == var.shape[0] 
-    time = nc.createDimension('time', time_size)
-    trajectory = nc.createDimension('trajectory', trajectory_size)
-    time_uv = nc.createDimension('time_uv', time_uv_size)
-    dim_tuple = ('time',)
-    uv_tuple = ('time_uv',)
-    if len(trajectorydata) > 1:
-        dim_tuple = ('time', 'trajectory',)
-        uv_tuple = ('time_uv', 'trajectory',)
-
-    # Global Attributes
+# Global attributes of a v0.0 file that don't depend on the data; `now` is the
+# creation time.
+def global_attributes_0_0(now):
     # 2013-07-22 kerfoot@marine.rutgers.edu: sync'd with github wiki global
     # attribute list.  Didn't resolve any DS comments/TODOs
-    global_attributes = {
+    return {
       'Conventions' : 'CF-1.6',
       'Metadata_Conventions' : 'Unidata Dataset Discovery v1.0', # TODO: A change has been proposed to ACDD.  Use this for now.
       'acknowledgment' : 'This deployment partially supported by ...', #
@@ -168,16 +277,10 @@ def writer_0_0(filename, timedata, time_uvdata, trajectorydata, segment_iddata,
       'date_modified' : now,
       'featureType' : 'trajectory',
       'format_version' : 'IOOS_Glider_NetCDF_Trajectory_Template_v0.0', # NOTE: Changed from file_version for conformance with GROOM.
-      'geospatial_lat_max' : latdata.max(),
-      'geospatial_lat_min' : latdata.min(),
       'geospatial_lat_resolution' : 'point',
       'geospatial_lat_units' : 'degrees_north',
-      'geospatial_lon_max' : londata.max(),
-      'geospatial_lon_min' : londata.min(),
       'geospatial_lon_resolution' : 'point',
       'geospatial_lon_units' : 'degrees_east',
-      'geospatial_vertical_max' : depthdata.max(),
-      'geospatial_vertical_min' : depthdata.min(),
       'geospatial_vertical_positive' : 'down',  
       'geospatial_vertical_resolution' : 'point',
       'geospatial_vertical_units' : 'meters',
@@ -199,985 +302,913 @@ def writer_0_0(filename, timedata, time_uvdata, trajectorydata, segment_iddata,
       'standard_name_vocabulary' : 'CF-v25', # TODO: Or, represent using URL e.g. http://cf-pcmdi.llnl.gov/documents/cf-standard-names/standard-name-table/25/
       'source' : 'Observational data from a profiling glider', 
       'summary' : 'The Rutgers University Coastal Ocean Observation Lab has deployed autonomous underwater gliders around the world since 1990. Gliders are small, free-swimming, unmanned vehicles that use changes in buoyancy to move vertically and horizontally through the water column in a saw-tooth pattern. They are deployed for days to several months and gather detailed information about the physical, chemical and biological processes of the world\'s The Slocum glider was designed and oceans. built by Teledyne Webb Research Corporation, Falmouth, MA, USA.',
-      'time_coverage_end' : timedata[0].strftime('%Y-%m-%d %H:%M UTC'),
       'time_coverage_resolution' : 'point',
-      'time_coverage_start' : timedata[-1].strftime('%Y-%m-%d %H:%M UTC'),
       'title' : 'Glider Dataset',
     }
-    for key in kwargs.iterkeys():
-        global_attributes[key] = kwargs[key]
-    # Dictionary of global file attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    for k in sorted(global_attributes.keys()) :
-        nc.setncattr(k, global_attributes[k])
 
-    # Create array of unsigned 8-bit integers to use for _qc flag values
-    QC_FLAGS = np.array(range(0,10), 'int8')
-    # Meanings of QC_FLAGS
-    QC_FLAG_MEANINGS = "no_qc_performed good_data probably_good_data bad_data_that_are_potentially_correctable bad_data value_changed interpolated_value missing_value";
+# Storage profiles of v0.0 files: createVariable() options by variable name,
+# '*' applying to all variables.  Besides zlib, complevel, shuffle and
+# least_significant_digit the options are
+#   dtype        storage type of a floating point variable, e.g. 'f4'
+#   chunking     None (the library's choice), 'time' for chunks of
+#                consecutive records of all trajectories (reads of time
+#                windows), 'trajectory' for chunks of a single trajectory
+#                (per-trajectory reads, e.g. over DAP) or a chunk shape
+#   chunk_bytes  size of 'time' and 'trajectory' chunks
+# 'default' is what writer_0_0() has always written.
+STORAGE_PROFILES = {
+    'default' : {'*' : {'zlib' : True, 'complevel' : COMP_LEVEL}},
+    # Quickest to write, largest files.
+    'fast' : {'*' : {'zlib' : False, 'chunking' : 'time'}},
+    # Smallest files: measurements as float32 rounded to their resolution,
+    # positions rounded to about 1 m.
+    'small' : {'*' : {'zlib' : True, 'complevel' : 9, 'shuffle' : True, 'chunking' : 'time'},
+               'lat' : {'least_significant_digit' : 5},
+               'lon' : {'least_significant_digit' : 5},
+               'depth' : {'dtype' : 'f4', 'least_significant_digit' : 2},
+               'pressure' : {'dtype' : 'f4', 'least_significant_digit' : 2},
+               'conductivity' : {'dtype' : 'f4', 'least_significant_digit' : 4},
+               'density' : {'dtype' : 'f4', 'least_significant_digit' : 3},
+               'salinity' : {'dtype' : 'f4', 'least_significant_digit' : 3},
+               'temperature' : {'dtype' : 'f4', 'least_significant_digit' : 3},
+               'u' : {'dtype' : 'f4', 'least_significant_digit' : 3},
+               'v' : {'dtype' : 'f4', 'least_significant_digit' : 3}},
+    # For services that read one trajectory at a time.
+    'dap' : {'*' : {'zlib' : True, 'complevel' : COMP_LEVEL, 'shuffle' : True, 'chunking' : 'trajectory'}},
+    # Small chunks along an unlimited time dimension, for short segment files
+    # (the default of writer_0_0(template=True)).
+    'segment' : {'*' : {'zlib' : True, 'complevel' : COMP_LEVEL, 'chunking' : 'time', 'chunk_bytes' : 16 * 1024}},
+}
+
+# createVariable() options of variable `name` in a storage profile (a name
+# in STORAGE_PROFILES or a dict like them, 'default' if None).
+def get_storage_options(profile, name):
+    if profile is None:
+        profile = 'default'
+    if isinstance(profile, basestring):
+        if profile not in STORAGE_PROFILES:
+            raise ValueError("Unknown storage profile %r, use one of %s" %
+                             (profile, ", ".join(sorted(STORAGE_PROFILES))))
+        profile = STORAGE_PROFILES[profile]
+    options = dict(profile.get('*', {}))
+    options.update(profile.get(name, {}))
+    return options
+
+# Chunk shape of a variable of dimension sizes `sizes` (0 for the unlimited
+# time dimension) and item size `itemsize` for a 'time' or 'trajectory'
+# chunking.
+def get_chunksizes(sizes, itemsize, chunking, chunk_bytes):
+    across = sizes[1] if chunking == 'time' and len(sizes) > 1 else 1
+    records = max(1, chunk_bytes // (itemsize * max(across, 1)))
+    if sizes[0]:
+        records = min(records, sizes[0])
+    return (records, max(across, 1))[:len(sizes)]
 
-    # Variable Definitions
+# nc.createVariable() with the options of the storage profile applied; they
+# take precedence over the keyword arguments.  Variables without dimensions
+# are created as they are.
+def create_variable(nc, profile, name, datatype, dimensions=(), **kwargs):
+    if not dimensions:
+        return nc.createVariable(name, datatype, dimensions, **kwargs)
+    options = get_storage_options(profile, name)
+    dtype = options.pop('dtype', None)
+    if np.dtype(datatype).kind != 'f':
+        options.pop('least_significant_digit', None)
+    elif dtype is not None:
+        datatype = np.dtype(dtype).str[1:]
+        if 'fill_value' in kwargs:
+            kwargs['fill_value'] = NC_FILL_VALUES[datatype]
+    chunking = options.pop('chunking', None)
+    chunk_bytes = options.pop('chunk_bytes', CHUNK_BYTES)
+    # The library would chunk an unlimited dimension by single records.
+    if chunking is None and nc.dimensions[dimensions[0]].isunlimited():
+        chunking = 'time'
+    sizes = [len(nc.dimensions[dim]) for dim in dimensions]
+    if chunking in ('time', 'trajectory'):
+        options['chunksizes'] = get_chunksizes(sizes, np.dtype(datatype).itemsize, chunking, chunk_bytes)
+    elif chunking is not None:
+        # A shape for (time, trajectory) also serves the 1D variables.
+        options['chunksizes'] = tuple(min(c, size) if size else c
+                                      for c, size in zip(chunking, sizes))
+    kwargs.update(options)
+    return nc.createVariable(name, datatype, dimensions, **kwargs)
 
+# Create array of unsigned 8-bit integers to use for _qc flag values
+QC_FLAGS = np.array(range(0,10), 'int8')
+# Meanings of QC_FLAGS
+QC_FLAG_MEANINGS = "no_qc_performed good_data probably_good_data bad_data_that_are_potentially_correctable bad_data value_changed interpolated_value missing_value";
+
+# Variable Definitions of v0.0 files, in the order they are created:
+# (name, datatype, dimensions, attributes).  dimensions is 'time', 'time_uv'
+# or 'trajectory' for that dimension alone, 'data' for the time series (time,
+# or time and trajectory in files of several trajectories), 'uv' likewise for
+# the depth-averaged currents and None for the container variables.
+# kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
+# variable so that it shows up as a variable attribute.  Use the default
+# fill_value based on the data type.  (All dimensioned variables but the
+# coordinate variables of the dimensions get one.)  The attributes are added
+# in alphabetical order (not necessary, but makes it easier to find them).
+VARIABLES_0_0 = [
     # ----------------------------------------------------------------------------
     # TIME
     # time: no _Fill_Value since dimension
-    time = nc.createVariable('time',
-                             'f8',
-                             ('time',),
-                             zlib=True,
-                             complevel=COMP_LEVEL)
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'axis' : "T",
-            'calendar' : 'gregorian',
-            'units' : 'seconds since 1970-01-01 00:00:00 UTC',
-            'standard_name' : 'time',
-            'long_name' : 'Time',
-            'observation_type' : 'measured',
-            'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        time.setncattr(k, atts[k])
-    time[:] = date2num(timedata, units=atts['units'], calendar=atts['calendar'])
-
+    ('time', 'f8', 'time',
+     {'axis' : "T",
+      'calendar' : 'gregorian',
+      'units' : 'seconds since 1970-01-01 00:00:00 UTC',
+      'standard_name' : 'time',
+      'long_name' : 'Time',
+      'observation_type' : 'measured',
+      'sensor_name' : '',
+     }),
     # ----------------------------------------------------------------------------
     # TIME_QC
     # time_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    time_qc = nc.createVariable('time_qc',
-                                'i1',
-                                ('time',),
-                                zlib=True,
-                                complevel=COMP_LEVEL,
-                                fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'time Quality Flag',
-             'standard_name' : 'time status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        time_qc.setncattr(k, atts[k])
-    if time_qcdata != None:
-        time_qc[:] = time_qcdata
+    ('time_qc', 'i1', 'time',
+     {'long_name' : 'time Quality Flag',
+      'standard_name' : 'time status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
     # ----------------------------------------------------------------------------
-
     # time_uv: 64 bit float - no _Fill_Value since dimension
-    time_uv = nc.createVariable('time_uv',
-                                'f8',
-                                ('time_uv',),
-                                zlib=True,
-                                complevel=COMP_LEVEL);
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'axis' : "T",
-            'calendar' : 'gregorian',
-            'units' : 'seconds since 1970-01-01 00:00:00 UTC',
-            'standard_name' : 'time',
-            'long_name' : 'Approximate time midpoint of each segment',
-            'observation_type' : 'estimated',
-    };
-    for k in sorted(atts.keys()):
-        time_uv.setncattr(k, atts[k])
-    time_uv[:] = date2num(time_uvdata, units=atts['units'], calendar=atts['calendar'])
-    # TODO: See [issue 2](https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/2). 
-    # ----------------------------------------------------------------------------
-
+    ('time_uv', 'f8', 'time_uv',
+     {'axis' : "T",
+      'calendar' : 'gregorian',
+      'units' : 'seconds since 1970-01-01 00:00:00 UTC',
+      'standard_name' : 'time',
+      'long_name' : 'Approximate time midpoint of each segment',
+      'observation_type' : 'estimated',
+     }),
+    # TODO: See [issue 2](https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/2).
     # ----------------------------------------------------------------------------
     # TRAJECTORY
     # trajectory: 2 byte integer - no _FillValue since dimension
-    # TODO: See [issue 1](https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/1). 
+    # TODO: See [issue 1](https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/1).
     # 2013-07-30 kerfoot: per discussion with dsnowden, we're going to go with
-    # hard coding the value of this variable to the number 1 across all files.  
+    # hard coding the value of this variable to the number 1 across all files.
     # TODO: Create 2 sets of 2 files: the first file set contains trajectory = 1
     # in both files.  the second file set contains trajectory = 1 in the first
     # file and trajectory=2 in the second.  Test TDS aggregation.
-    trajectory = nc.createVariable('trajectory',
-                                   'i2',
-                                   ('trajectory',),
-                                   zlib=True,
-                                   complevel=COMP_LEVEL)
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'cf_role' : 'trajectory_id',
-            'long_name' : 'Unique identifier for each trajectory feature contained in the file',
-            'comment' : 'A trajectory can span multiple data files each containing a single segment.',
-    }
-    for k in sorted(atts.keys()):
-        trajectory.setncattr(k, atts[k])
-    trajectory[:] = trajectorydata
-    # ----------------------------------------------------------------------------
-
+    ('trajectory', 'i2', 'trajectory',
+     {'cf_role' : 'trajectory_id',
+      'long_name' : 'Unique identifier for each trajectory feature contained in the file',
+      'comment' : 'A trajectory can span multiple data files each containing a single segment.',
+     }),
     # ----------------------------------------------------------------------------
     # SEGMENT_ID
     # segment_id: 2 byte integer
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    segment_id = nc.createVariable('segment_id',
-                                   'i2',
-                                   dim_tuple,
-                                   zlib=True,
-                                   complevel=COMP_LEVEL,
-                                   fill_value=NC_FILL_VALUES['i2'])
-    atts = {'comment' : 'Sequential segment number within a trajectory/deployment. A segment corresponds to the set of data collected between 2 gps fixes obtained when the glider surfaces.',
-            'long_name' : 'Segment ID',
-            'valid_min' : 1,
-            'valid_max' : 999,
-            'observation_type' : 'calculated',
-    }
-    for k in sorted(atts.keys()):
-        segment_id.setncattr(k, atts[k])
-    segment_id[:] = segment_iddata
+    ('segment_id', 'i2', 'data',
+     {'comment' : 'Sequential segment number within a trajectory/deployment. A segment corresponds to the set of data collected between 2 gps fixes obtained when the glider surfaces.',
+      'long_name' : 'Segment ID',
+      'valid_min' : 1,
+      'valid_max' : 999,
+      'observation_type' : 'calculated',
+     }),
     # kerfoot@marine.rutgers.edu: Removed attributes: ancillary_variables, platform
-    # ----------------------------------------------------------------------------
-
     # ----------------------------------------------------------------------------
     # PROFILE_ID
     # profile_id: 2 byte integer
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    profile_id = nc.createVariable('profile_id',
-                                   'i2',
-                                   dim_tuple,
-                                   zlib=True,
-                                   complevel=COMP_LEVEL,
-                                   fill_value=NC_FILL_VALUES['i2'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'comment' : 'Sequential profile number within the current segment. A profile is defined as a single dive or climb', #  TODO: Revise definition'
-            'long_name' : 'Profile ID',
-            'valid_min' : 1,
-            'valid_max' : 999,
-            'observation_type' : 'calculated',
-    }
-    for k in sorted(atts.keys()):
-        profile_id.setncattr(k, atts[k])
-    profile_id[:] = profile_iddata
+    ('profile_id', 'i2', 'data',
+     {'comment' : 'Sequential profile number within the current segment. A profile is defined as a single dive or climb', #  TODO: Revise definition'
+      'long_name' : 'Profile ID',
+      'valid_min' : 1,
+      'valid_max' : 999,
+      'observation_type' : 'calculated',
+     }),
     # kerfoot@marine.rutgers.edu: Removed attributes: ancillary_variables, platform
-    # ----------------------------------------------------------------------------
-
     # ----------------------------------------------------------------------------
     # DEPTH
     # depth: 64 bit float
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    depth = nc.createVariable('depth',
-                              'f8',
-                              dim_tuple,
-                              zlib=True,
-                              complevel=COMP_LEVEL,
-                              fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'axis' : 'Z',
-            'units' : 'meters',
-            'standard_name' : 'depth',
-            'valid_min' : 0,
-            'valid_max' : 2000,
-            'long_name' : 'Depth',
-            'reference_datum' : 'sea-surface', # TODO: https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/3
-            'positive' : 'down', # Changed from vertical_positive to positive. http://cf-pcmdi.llnl.gov/documents/cf-conventions/1.6/cf-conventions.html#idp5784080
-            'observation_type' : 'calculated',
-            'ancillary_variables' : 'depth_qc',
-            'platform' : 'platform',
-            'instrument' : 'instrument_ctd',
-            'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        depth.setncattr(k, atts[k])
-    depth[:] = depthdata
+    ('depth', 'f8', 'data',
+     {'axis' : 'Z',
+      'units' : 'meters',
+      'standard_name' : 'depth',
+      'valid_min' : 0,
+      'valid_max' : 2000,
+      'long_name' : 'Depth',
+      'reference_datum' : 'sea-surface', # TODO: https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/3
+      'positive' : 'down', # Changed from vertical_positive to positive. http://cf-pcmdi.llnl.gov/documents/cf-conventions/1.6/cf-conventions.html#idp5784080
+      'observation_type' : 'calculated',
+      'ancillary_variables' : 'depth_qc',
+      'platform' : 'platform',
+      'instrument' : 'instrument_ctd',
+      'sensor_name' : '',
+     }),
     # kerfoot@marine.rutgers.edu: removed 'instrument_ctd' from # ancillary_variables
-    # ----------------------------------------------------------------------------
-
     # ----------------------------------------------------------------------------
     # DEPTH_QC
     # depth_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    depth_qc = nc.createVariable('depth_qc',
-                                 'i1',
-                                 dim_tuple,
-                                 zlib=True,
-                                 complevel=COMP_LEVEL,
-                                 fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'depth Quality Flag',
-             'standard_name' : 'depth status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        depth_qc.setncattr(k, atts[k])
-    if depth_qcdata != None:
-        depth_qc[:] = depth_qcdata
-    #depth_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
+    ('depth_qc', 'i1', 'data',
+     {'long_name' : 'depth Quality Flag',
+      'standard_name' : 'depth status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #depth_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # TODO: I don't think the ancillary_variable reference is intended to be bi-directional.
     # kerfoot@marine.rutgers.edu: removed 'ancillary_variable' attribute
-    # ----------------------------------------------------------------------------
-
     # ----------------------------------------------------------------------------
     # LAT
     # lat: 64 bit float
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    lat = nc.createVariable('lat',
-                            'f8',
-                            dim_tuple,
-                            zlib=True,
-                            complevel=COMP_LEVEL,
-                            fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'axis' : 'Y',
-             'units' : 'degrees_north',
-             'standard_name' : 'latitude',
-             'long_name' : 'Latitude',
-             'flag_meanings' : '',
-             'valid_min' : -90.,
-             'valid_max' : 90.,
-             'observation_type' : 'measured',
-             'ancillary_variables' : 'lat_qc',
-             'platform' : 'platform',
-             'comment' : 'Some values are linearly interpolated between measured coordinates.  See lat_qc', # kerfoot@marine.rutgers.edu: Should we interpolate missing values and add a comment ?  If so, what do do with 'observation_type' ?
-             'sensor_name' : '',
-             'reference' : 'WGS84', # GROOM manual, p16
-             'coordinate_reference_frame' : 'urn:ogc:crs:EPSG::4326', # GROOM manual, p16
-    }
-    for k in sorted(atts.keys()):
-        lat.setncattr(k, atts[k])
-    lat[:] = latdata
-    # ----------------------------------------------------------------------------
-
+    ('lat', 'f8', 'data',
+     {'axis' : 'Y',
+      'units' : 'degrees_north',
+      'standard_name' : 'latitude',
+      'long_name' : 'Latitude',
+      'flag_meanings' : '',
+      'valid_min' : -90.,
+      'valid_max' : 90.,
+      'observation_type' : 'measured',
+      'ancillary_variables' : 'lat_qc',
+      'platform' : 'platform',
+      'comment' : 'Some values are linearly interpolated between measured coordinates.  See lat_qc', # kerfoot@marine.rutgers.edu: Should we interpolate missing values and add a comment ?  If so, what do do with 'observation_type' ?
+      'sensor_name' : '',
+      'reference' : 'WGS84', # GROOM manual, p16
+      'coordinate_reference_frame' : 'urn:ogc:crs:EPSG::4326', # GROOM manual, p16
+     }),
     # ----------------------------------------------------------------------------
     # LAT_QC
     # lat_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    lat_qc = nc.createVariable('lat_qc',
-                               'i1',
-                               dim_tuple,
-                               zlib=True,
-                               complevel=COMP_LEVEL,
-                               fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'lat Quality Flag',
-             'standard_name' : 'lat status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        lat_qc.setncattr(k, atts[k])
-    if lat_qcdata != None:
-        lat_qc[:] = lat_qcdata
-    #lat_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('lat_qc', 'i1', 'data',
+     {'long_name' : 'lat Quality Flag',
+      'standard_name' : 'lat status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #lat_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # LON
     # lon: 64 bit float
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    lon = nc.createVariable('lon',
-                            'f8',
-                            dim_tuple,
-                            zlib=True,
-                            complevel=COMP_LEVEL,
-                            fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'axis' : 'X',
-             'units' : 'degrees_east',
-             'standard_name' : 'longitude',
-             'long_name' : 'Longitude',
-             'flag_meanings' : '',
-             'valid_min' : -180.,
-             'valid_max' : 180.,
-             'observation_type' : 'measured',
-             'ancillary_variables' : 'lon_qc',
-             'platform' : 'platform',
-             'comment' : 'Some values are linearly interpolated between measured coordinates.  See lon_qc', # kerfoot@marine.rutgers.edu: Should we interpolate missing values and add a comment ? If so, what to do with 'observation_type' ?
-             'sensor_name' : '',
-             'reference' : 'WGS84', # GROOM manual, p16
-             'coordinate_reference_frame' : 'urn:ogc:crs:EPSG::4326', # GROOM manual, p16
-    }
-    for k in sorted(atts.keys()):
-        lon.setncattr(k, atts[k])
-    lon[:] = londata
-    # ----------------------------------------------------------------------------
-
+    ('lon', 'f8', 'data',
+     {'axis' : 'X',
+      'units' : 'degrees_east',
+      'standard_name' : 'longitude',
+      'long_name' : 'Longitude',
+      'flag_meanings' : '',
+      'valid_min' : -180.,
+      'valid_max' : 180.,
+      'observation_type' : 'measured',
+      'ancillary_variables' : 'lon_qc',
+      'platform' : 'platform',
+      'comment' : 'Some values are linearly interpolated between measured coordinates.  See lon_qc', # kerfoot@marine.rutgers.edu: Should we interpolate missing values and add a comment ? If so, what to do with 'observation_type' ?
+      'sensor_name' : '',
+      'reference' : 'WGS84', # GROOM manual, p16
+      'coordinate_reference_frame' : 'urn:ogc:crs:EPSG::4326', # GROOM manual, p16
+     }),
     # ----------------------------------------------------------------------------
     # LON_QC
     # lon_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    lon_qc = nc.createVariable('lon_qc',
-                               'i1',
-                               dim_tuple,
-                               zlib=True,
-                               complevel=COMP_LEVEL,
-                               fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'lon Quality Flag',
-             'standard_name' : 'lon status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        lon_qc.setncattr(k, atts[k])
-    if lon_qcdata != None:
-        lon_qc[:] = lon_qcdata
-    #lon_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('lon_qc', 'i1', 'data',
+     {'long_name' : 'lon Quality Flag',
+      'standard_name' : 'lon status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #lon_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # PRESSURE
     # pressure: 64 bit float
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
     # 2013-07-30 kerfoot: added accuracy, resolution and precision attributes per
     # GROOM specification.
-    pressure = nc.createVariable('pressure',
-                                 'f8',
-                                 dim_tuple,
-                                 zlib=True,
-                                 complevel=COMP_LEVEL,
-                                 fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'axis' : 'Z',
-            'units' : 'dbar',
-            'standard_name' : 'pressure',
-            'valid_min' : 0,
-            'valid_max' : 2000,
-            'long_name' : 'Pressure',
-            'reference_datum' : 'sea-surface', 
-            'positive' : 'down', 
-            'observation_type' : 'calculated',
-            'ancillary_variables' : 'pressure_qc',
-            'platform' : 'platform',
-            'instrument' : 'instrument_ctd',
-            'accuracy' : '',
-            'precision' : '',
-            'resolution' : '',
-            'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        pressure.setncattr(k, atts[k])
-    pressure[:] = pressuredata
+    ('pressure', 'f8', 'data',
+     {'axis' : 'Z',
+      'units' : 'dbar',
+      'standard_name' : 'pressure',
+      'valid_min' : 0,
+      'valid_max' : 2000,
+      'long_name' : 'Pressure',
+      'reference_datum' : 'sea-surface',
+      'positive' : 'down',
+      'observation_type' : 'calculated',
+      'ancillary_variables' : 'pressure_qc',
+      'platform' : 'platform',
+      'instrument' : 'instrument_ctd',
+      'accuracy' : '',
+      'precision' : '',
+      'resolution' : '',
+      'sensor_name' : '',
+     }),
     # kerfoot@marine.rutgers.edu: removed 'instrument_ctd' from # ancillary_variables
-    # ----------------------------------------------------------------------------
-
     # ----------------------------------------------------------------------------
     # PRESSURE_QC
     # pressure_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    pressure_qc = nc.createVariable('pressure_qc',
-                                    'i1',
-                                    dim_tuple,
-                                    zlib=True,
-                                    complevel=COMP_LEVEL,
-                                    fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'pressure Quality Flag',
-             'standard_name' : 'pressure status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        pressure_qc.setncattr(k, atts[k])
-    if pressure_qcdata != None:
-        pressure_qc[:] = pressure_qcdata
-    #pressure_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('pressure_qc', 'i1', 'data',
+     {'long_name' : 'pressure Quality Flag',
+      'standard_name' : 'pressure status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #pressure_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # CONDUCTIVITY
     # 2013-07-30 kerfoot: added accuracy, resolution and precision attributes per
     # GROOM specification.
     # conductivity: 64 bit float
-    conductivity = nc.createVariable('conductivity',
-                                     'f8',
-                                     dim_tuple,
-                                     zlib=True,
-                                     complevel=COMP_LEVEL,
-                                     fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'units' : 'S m-1',
-             'standard_name' : 'sea_water_electrical_conductivity',
-             'valid_min' : 0.,
-             'valid_max' : 10.,
-             'long_name' : 'Conductivity',
-             'observation_type' : 'measured',
-             'ancillary_variables' : 'conductivity_qc',
-             'platform' : 'platform',
-             'instrument' : 'instrument_ctd',
-             'coordinates' : 'lon lat depth time',
-             'accuracy' : '',
-             'precision' : '',
-             'resolution' : '',
-             'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        conductivity.setncattr(k, atts[k])
-    conductivity[:] = conductivitydata
-    # ----------------------------------------------------------------------------
-
+    ('conductivity', 'f8', 'data',
+     {'units' : 'S m-1',
+      'standard_name' : 'sea_water_electrical_conductivity',
+      'valid_min' : 0.,
+      'valid_max' : 10.,
+      'long_name' : 'Conductivity',
+      'observation_type' : 'measured',
+      'ancillary_variables' : 'conductivity_qc',
+      'platform' : 'platform',
+      'instrument' : 'instrument_ctd',
+      'coordinates' : 'lon lat depth time',
+      'accuracy' : '',
+      'precision' : '',
+      'resolution' : '',
+      'sensor_name' : '',
+     }),
     # ----------------------------------------------------------------------------
     # CONDUCTIVITY_QC
     # conductivity_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    conductivity_qc = nc.createVariable('conductivity_qc',
-                                        'i1',
-                                        dim_tuple,
-                                        zlib=True,
-                                        complevel=COMP_LEVEL,
-                                        fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'conductivity Quality Flag',
-             'standard_name' : 'conductivity status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        conductivity_qc.setncattr(k, atts[k])
-    if conductivity_qcdata != None:
-        conductivity_qc[:] = conductivity_qcdata
-    #conductivity_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('conductivity_qc', 'i1', 'data',
+     {'long_name' : 'conductivity Quality Flag',
+      'standard_name' : 'conductivity status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #conductivity_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # DENSITY
     # density: 64 bit float
-    density = nc.createVariable('density',
-                                'f8',
-                                dim_tuple,
-                                zlib=True,
-                                complevel=COMP_LEVEL,
-                                fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'units' : 'kg m-3',
-             'standard_name' : 'sea_water_density',
-             'valid_min' : 1015.,
-             'valid_max' : 1040.,
-             'long_name' : 'Density',
-             'observation_type' : 'calculated',
-             'ancillary_variables' : 'density_qc',
-             'platform' : 'platform',
-             'instrument' : 'instrument_ctd',
-             'coordinates' : 'lon lat depth time',
-             'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        density.setncattr(k, atts[k])
-    density[:] = densitydata
-    # ----------------------------------------------------------------------------
-
+    ('density', 'f8', 'data',
+     {'units' : 'kg m-3',
+      'standard_name' : 'sea_water_density',
+      'valid_min' : 1015.,
+      'valid_max' : 1040.,
+      'long_name' : 'Density',
+      'observation_type' : 'calculated',
+      'ancillary_variables' : 'density_qc',
+      'platform' : 'platform',
+      'instrument' : 'instrument_ctd',
+      'coordinates' : 'lon lat depth time',
+      'sensor_name' : '',
+     }),
     # ----------------------------------------------------------------------------
     # DENSITY_QC
     # density_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    density_qc = nc.createVariable('density_qc',
-                                   'i1',
-                                   dim_tuple,
-                                   zlib=True,
-                                   complevel=COMP_LEVEL,
-                                   fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'density Quality Flag',
-             'standard_name' : 'density status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        density_qc.setncattr(k, atts[k])
-    if density_qcdata != None:
-        density_qc[:] = density_qcdata
-    #density_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('density_qc', 'i1', 'data',
+     {'long_name' : 'density Quality Flag',
+      'standard_name' : 'density status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #density_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # SALINITY
     # salinity: 64 bit float
-    salinity = nc.createVariable('salinity',
-                                 'f8',
-                                 dim_tuple,
-                                 zlib=True,
-                                 complevel=COMP_LEVEL,
-                                 fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'units' : '1e-3',
-             'standard_name' : 'sea_water_salinity',
-             'valid_min' : 0.,
-             'valid_max' : 40.,
-             'long_name' : 'Salinity',
-             'observation_type' : 'calculated',
-             'ancillary_variables' : 'salinity_qc',
-             'platform' : 'platform',
-             'instrument' : 'instrument_ctd',
-             'coordinates' : 'lon lat depth time',
-             'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        salinity.setncattr(k, atts[k])
-    salinity[:] = salinitydata
-    # ----------------------------------------------------------------------------
-
+    ('salinity', 'f8', 'data',
+     {'units' : '1e-3',
+      'standard_name' : 'sea_water_salinity',
+      'valid_min' : 0.,
+      'valid_max' : 40.,
+      'long_name' : 'Salinity',
+      'observation_type' : 'calculated',
+      'ancillary_variables' : 'salinity_qc',
+      'platform' : 'platform',
+      'instrument' : 'instrument_ctd',
+      'coordinates' : 'lon lat depth time',
+      'sensor_name' : '',
+     }),
     # ----------------------------------------------------------------------------
     # SALINITY_QC
     # salinity_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    salinity_qc = nc.createVariable('salinity_qc',
-                                    'i1',
-                                    dim_tuple,
-                                    zlib=True,
-                                    complevel=COMP_LEVEL,
-                                    fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'salinity Quality Flag',
-             'standard_name' : 'salinity status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        salinity_qc.setncattr(k, atts[k])
-    if salinity_qcdata != None:
-        salinity_qc[:] = salinity_qcdata
-    #salinity_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('salinity_qc', 'i1', 'data',
+     {'long_name' : 'salinity Quality Flag',
+      'standard_name' : 'salinity status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #salinity_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # TEMPERATURE
     # 2013-07-30 kerfoot: added accuracy, resolution and precision attributes per
     # GROOM specification.
     # temperature: 64 bit float
-    temperature = nc.createVariable('temperature',
-                                    'f8',
-                                    dim_tuple,
-                                    zlib=True,
-                                    complevel=COMP_LEVEL,
-                                    fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'units' : 'Celsius',
-             'standard_name' : 'sea_water_temperature',
-             'valid_min' : -5.,
-             'valid_max' : 40.,
-             'long_name' : 'Temperature',
-             'observation_type' : 'measured',
-             'ancillary_variables' : 'temperature_qc',
-             'platform' : 'platform',
-             'instrument' : 'instrument_ctd',
-             'coordinates' : 'lon lat depth time',
-             'accuracy' : '',
-             'precision' : '',
-             'resolution' : '',
-             'sensor_name' : '',
-    }
-    for k in sorted(atts.keys()):
-        temperature.setncattr(k, atts[k])
-    temperature[:] = temperaturedata
-    # ----------------------------------------------------------------------------
-
+    ('temperature', 'f8', 'data',
+     {'units' : 'Celsius',
+      'standard_name' : 'sea_water_temperature',
+      'valid_min' : -5.,
+      'valid_max' : 40.,
+      'long_name' : 'Temperature',
+      'observation_type' : 'measured',
+      'ancillary_variables' : 'temperature_qc',
+      'platform' : 'platform',
+      'instrument' : 'instrument_ctd',
+      'coordinates' : 'lon lat depth time',
+      'accuracy' : '',
+      'precision' : '',
+      'resolution' : '',
+      'sensor_name' : '',
+     }),
     # ----------------------------------------------------------------------------
     # TEMPERATURE_QC
     # temperature_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    temperature_qc = nc.createVariable('temperature_qc',
-                                       'i1',
-                                       dim_tuple,
-                                       zlib=True,
-                                       complevel=COMP_LEVEL,
-                                       fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'temperature Quality Flag',
-             'standard_name' : 'temperature status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        temperature_qc.setncattr(k, atts[k])
-    if temperature_qcdata != None:
-        temperature_qc[:] = temperature_qcdata
+    ('temperature_qc', 'i1', 'data',
+     {'long_name' : 'temperature Quality Flag',
+      'standard_name' : 'temperature status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
     #temperature_qc.flag_meanings = ""
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # LAT_UV
     # lat_uv: 64 bit float
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    lat_uv = nc.createVariable('lat_uv',
-                               'f8',
-                               uv_tuple,
-                               zlib=True,
-                               complevel=COMP_LEVEL,
-                               fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'axis' : 'Y',
-             'units' : 'degrees_north',
-             'standard_name' : 'latitude',
-             'long_name' : 'Center Latitude for Depth-Averaged Current',
-             'valid_min' : -90.,
-             'valid_max' : 90.,
-             'observation_type' : 'calculated',
-             'platform' : 'platform',
-             'comment' : 'Values are interpolated to provide the center latitude of the segment',
-    }
-    for k in sorted(atts.keys()):
-        lat_uv.setncattr(k, atts[k])
-    lat_uv[:] = lat_uvdata
-    # ----------------------------------------------------------------------------
-
+    ('lat_uv', 'f8', 'uv',
+     {'axis' : 'Y',
+      'units' : 'degrees_north',
+      'standard_name' : 'latitude',
+      'long_name' : 'Center Latitude for Depth-Averaged Current',
+      'valid_min' : -90.,
+      'valid_max' : 90.,
+      'observation_type' : 'calculated',
+      'platform' : 'platform',
+      'comment' : 'Values are interpolated to provide the center latitude of the segment',
+     }),
     # ----------------------------------------------------------------------------
     # LON_UV
     # lon_uv: 64 bit float
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    lon_uv = nc.createVariable('lon_uv',
-                               'f8',
-                               uv_tuple,
-                               zlib=True,
-                               complevel=COMP_LEVEL,
-                               fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'axis' : 'X',
-             'units' : 'degrees_east',
-             'standard_name' : 'longitude',
-             'long_name' : 'Center Longitude for Depth-Averaged Current',
-             'valid_min' : -180.,
-             'valid_max' : 180.,
-             'observation_type' : 'calculated',
-             'platform' : 'platform',
-             'comment' : 'Values are interpolated to provide the center longitude of the segment',
-    }
-    for k in sorted(atts.keys()):
-        lon_uv.setncattr(k, atts[k])
-    lon_uv[:] = lon_uvdata
-    # ----------------------------------------------------------------------------
-
+    ('lon_uv', 'f8', 'uv',
+     {'axis' : 'X',
+      'units' : 'degrees_east',
+      'standard_name' : 'longitude',
+      'long_name' : 'Center Longitude for Depth-Averaged Current',
+      'valid_min' : -180.,
+      'valid_max' : 180.,
+      'observation_type' : 'calculated',
+      'platform' : 'platform',
+      'comment' : 'Values are interpolated to provide the center longitude of the segment',
+     }),
     # ----------------------------------------------------------------------------
     # U
     # u: 64 bit float
-    u = nc.createVariable('u',
-                          'f8',
-                          uv_tuple,
-                          zlib=True,
-                          complevel=COMP_LEVEL,
-                          fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'units' : 'm s-1',
-            'standard_name' : 'eastward_sea_water_velocity',
-            'valid_min' : -10.,
-            'valid_max' : 10.,
-            'long_name' : 'Eastward Sea Water Velocity',
-            'observation_type' : 'calculated',
-            'coordinates' : 'time_uv',
-            'platform' : 'platform',
-            'sensor_name' : '',
-            'coordinates' : 'lon_uv lat_uv time_uv',
-    }
-    for k in sorted(atts.keys()):
-        u.setncattr(k, atts[k])
-    u[:] = udata
-    # ----------------------------------------------------------------------------
-
+    ('u', 'f8', 'uv',
+     {'units' : 'm s-1',
+      'standard_name' : 'eastward_sea_water_velocity',
+      'valid_min' : -10.,
+      'valid_max' : 10.,
+      'long_name' : 'Eastward Sea Water Velocity',
+      'observation_type' : 'calculated',
+      'coordinates' : 'time_uv',
+      'platform' : 'platform',
+      'sensor_name' : '',
+      'coordinates' : 'lon_uv lat_uv time_uv',
+     }),
     # ----------------------------------------------------------------------------
     # U_QC
     # u_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    u_qc = nc.createVariable('u_qc',
-                             'i1',
-                             uv_tuple,
-                             zlib=True,
-                             complevel=COMP_LEVEL,
-                             fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'u Quality Flag',
-             'standard_name' : 'u status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        u_qc.setncattr(k, atts[k])
-    if u_qcdata != None:
-        u_qc[:] = u_qcdata
-    #u_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
-    # ----------------------------------------------------------------------------
-
+    ('u_qc', 'i1', 'uv',
+     {'long_name' : 'u Quality Flag',
+      'standard_name' : 'u status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #u_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
     # V
     # v: 64 bit float
-    v = nc.createVariable('v',
-                          'f8',
-                          uv_tuple,
-                          zlib=True,
-                          complevel=COMP_LEVEL,
-                          fill_value=NC_FILL_VALUES['f8'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'units' : 'm s-1',
-            'standard_name' : 'northward_sea_water_velocity',
-            'valid_min' : -10.,
-            'valid_max' : 10.,
-            'long_name' : 'Northward Sea Water Velocity',
-            'observation_type' : 'calculated',
-            'coordinates' : 'time_uv',
-            'platform' : 'platform',
-            'sensor_name' : '',
-            'coordinates' : 'lon_uv lat_uv time_uv',
-    }
-    for k in sorted(atts.keys()):
-        v.setncattr(k, atts[k])
-    v[:] = vdata
-    # ----------------------------------------------------------------------------
-
+    ('v', 'f8', 'uv',
+     {'units' : 'm s-1',
+      'standard_name' : 'northward_sea_water_velocity',
+      'valid_min' : -10.,
+      'valid_max' : 10.,
+      'long_name' : 'Northward Sea Water Velocity',
+      'observation_type' : 'calculated',
+      'coordinates' : 'time_uv',
+      'platform' : 'platform',
+      'sensor_name' : '',
+      'coordinates' : 'lon_uv lat_uv time_uv',
+     }),
     # ----------------------------------------------------------------------------
     # V_QC
     # v_qc: 1 byte integer (ie: byte)
-    # kerfoot@marine.rutgers.edu: explicitly specify fill_value when creating
-    # variable so that it shows up as a variable attribute.  Use the default
-    # fill_value based on the data type.
-    v_qc = nc.createVariable('v_qc',
-                             'i1',
-                             uv_tuple,
-                             zlib=True,
-                             complevel=COMP_LEVEL,
-                             fill_value=NC_FILL_VALUES['i1'])
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = { 'long_name' : 'v Quality Flag',
-             'standard_name' : 'v status_flag',
-             'flag_meanings' : QC_FLAG_MEANINGS,
-             'valid_min' : QC_FLAGS[0],
-             'valid_max' : QC_FLAGS[-1],
-             'flag_values' : QC_FLAGS,
-    }
-    for k in sorted(atts.keys()):
-        v_qc.setncattr(k, atts[k])
-    if v_qcdata != None:
-        v_qc[:] = v_qcdata
-    #v_qc.flag_meanings = "" 
-    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags? 
+    ('v_qc', 'i1', 'uv',
+     {'long_name' : 'v Quality Flag',
+      'standard_name' : 'v status_flag',
+      'flag_meanings' : QC_FLAG_MEANINGS,
+      'valid_min' : QC_FLAGS[0],
+      'valid_max' : QC_FLAGS[-1],
+      'flag_values' : QC_FLAGS,
+     }),
+    #v_qc.flag_meanings = ""
+    # TODO: Choose QC Flag set for use in the representative case and inthe manual/wiki.  IODE flags?
     # ----------------------------------------------------------------------------
-
     # Container Variables
     # ----------------------------------------------------------------------------
     # PLATFORM
     # platform: 1 byte integer, not dimensioned
-    platform = nc.createVariable('platform',
-                                 'i1');
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
-    # attributes in alphabetical order (not necessary, but makes it easier to find
-    # attributes that are in alphabetical order)
-    atts = {'type' : 'platform',
-            'id' : 'ru29',
-            'wmo_id' : 'ru29',
-            'comment' : 'Slocum Glider ru29',
-            'long_name' : 'Slocum Glider ru29',
-            'instrument' : 'instrument_ctd',
-    }
-    for k in sorted(atts.keys()):
-        platform.setncattr(k, atts[k])
-    
-    # ----------------------------------------------------------------------------
-
+    ('platform', 'i1', None,
+     {'type' : 'platform',
+      'id' : 'ru29',
+      'wmo_id' : 'ru29',
+      'comment' : 'Slocum Glider ru29',
+      'long_name' : 'Slocum Glider ru29',
+      'instrument' : 'instrument_ctd',
+     }),
     # ----------------------------------------------------------------------------
     # INSTRUMENT
     # TODO: Determine the number of instrument variables needed.  https://github.com/IOOSProfilingGliders/Real-Time-File-Format/issues/4
     # 2013-07-30 kerfoot: moved accuracy, precision attributes to C,T and P
     # variables.  Deleted valid_range attribute.
     # instrument_ctd: 1 byte integer, not dimensioned
-    instrument_ctd = nc.createVariable('instrument_ctd',
-                                       'i1');
-    # Dictionary of variable attributes.  Use a dictionary so that we can add the
+    ('instrument_ctd', 'i1', None,
+     {'serial_number' : '0098',
+      'make_model' : 'Seabird SBE 41CP',
+      'comment' : 'Slocum Glider ru29',
+      'long_name' : 'Seabird SBD 41CP Conductivity, Temperature, Depth Sensor',
+      'platform' : 'platform',
+      'calibration_date' : '2000-01-01', # ISO 8601 date
+      'factory_calibrated' : '',
+      'user_calibrated' : '',
+      'calibration_report' : '',
+     }),
+    # ----------------------------------------------------------------------------
+]
+
+# Creates the variables of a v0.0 file (see VARIABLES_0_0), with their
+# attributes, along the dimensions dim_tuple (time series) and uv_tuple
+# (depth-averaged currents), stored as the storage profile says (see
+# STORAGE_PROFILES).  The data is written by the caller.
+def define_variables_0_0(nc, dim_tuple, uv_tuple, profile=None):
+    dimensions = {'data' : dim_tuple, 'uv' : uv_tuple, None : ()}
+    for name, datatype, dims, atts in VARIABLES_0_0:
+        dims = dimensions.get(dims, (dims,))
+        kwargs = {}
+        if dims:
+            kwargs = {'zlib' : True, 'complevel' : COMP_LEVEL}
+            if name not in nc.dimensions:
+                kwargs['fill_value'] = NC_FILL_VALUES[datatype]
+        var = create_variable(nc, profile, name, datatype, dims, **kwargs)
+        for k in sorted(atts.keys()):
+            var.setncattr(k, atts[k])
+
+# Dimensions of the time series and of the depth-averaged currents of a v0.0
+# file with trajectory_size trajectories.
+def get_dimensions_0_0(trajectory_size):
+    dim_tuple = ('time',)
+    uv_tuple = ('time_uv',)
+    if trajectory_size > 1:
+        dim_tuple = ('time', 'trajectory',)
+        uv_tuple = ('time_uv', 'trajectory',)
+    return dim_tuple, uv_tuple
+
+# Values of the time variable var for timedata: datetimes, or with units
+# numbers in units and calendar, which are rescaled without creating any
+# datetime objects (see convert_time()).
+def get_file_times(var, timedata, units=None, calendar=None):
+    if units is None:
+        return date2num(timedata, units=var.units, calendar=var.calendar)
+    return convert_time(timedata, units, calendar, var.units, var.calendar)
+
+# Folds a block of the time series into stats (a CoverageStats) for the
+# coverage attributes; times are in the units of the file.
+def update_coverage_stats_0_0(stats, times, latdata, londata, depthdata):
+    stats.update('time', times)
+    for name, data in (('lat', latdata), ('lon', londata), ('vertical', depthdata)):
+        data = np.ma.asanyarray(data)
+        stats.update(name, data, NC_FILL_VALUES.get(data.dtype.str[1:]))
+
+# geospatial_* and time_coverage_* attributes of stats, whose times are in
+# the units of the time variable tvar.  Attributes without any valid value
+# are left out.
+def get_coverage_attributes_0_0(stats, tvar):
+    attributes = {}
+    for name in ('lat', 'lon', 'vertical'):
+        extent = stats.extent(name)
+        if extent is not None:
+            attributes['geospatial_%s_min' % name] = extent[0]
+            attributes['geospatial_%s_max' % name] = extent[1]
+    extent = stats.extent('time')
+    if extent is not None:
+        start, end = num2date(list(extent), units=tvar.units, calendar=tvar.calendar)
+        attributes['time_coverage_start'] = start.strftime('%Y-%m-%d %H:%M UTC')
+        attributes['time_coverage_end'] = end.strftime('%Y-%m-%d %H:%M UTC')
+    return attributes
+
+# Global attributes that record when a file was written.
+DATED_ATTRIBUTES = ('date_created', 'date_issued', 'date_modified', 'history')
+
+# Empty v0.0 files (their contents) by trajectory size, time_uv size and
+# storage profile, see get_template_0_0().
+templates_0_0 = {}
+
+# Contents of an empty v0.0 file: the dimensions (time unlimited), all
+# variables and the global attributes, without data.  Built once per process
+# for every structure; netCDF files can't be created in memory reliably, so it
+# goes through a temporary file.
+def get_template_0_0(trajectory_size, time_uv_size, profile=None):
+    key = (trajectory_size, time_uv_size, json.dumps(profile, sort_keys=True))
+    template = templates_0_0.get(key)
+    if template is None:
+        fd, path = tempfile.mkstemp(suffix='.nc')
+        os.close(fd)
+        try:
+            with Dataset(path, 'w', format='NETCDF4_CLASSIC') as nc:
+                nc.createDimension('time', None)
+                nc.createDimension('trajectory', trajectory_size)
+                nc.createDimension('time_uv', time_uv_size)
+                global_attributes = global_attributes_0_0(t.ctime(t.time()))
+                for k in sorted(global_attributes.keys()):
+                    nc.setncattr(k, global_attributes[k])
+                dim_tuple, uv_tuple = get_dimensions_0_0(trajectory_size)
+                define_variables_0_0(nc, dim_tuple, uv_tuple, profile)
+            with open(path, 'rb') as f:
+                template = f.read()
+        finally:
+            os.remove(path)
+        templates_0_0[key] = template
+    return template
+
+# Writes a v0.0 file.  Any data argument but timedata, time_uvdata,
+# trajectorydata, depthdata, latdata and londata may be None: the variable is
+# then absent, i.e. defined with its _FillValue but never written, so that no
+# chunks are allocated for it and it reads as all missing values.  profile
+# is the storage profile of the variables (see STORAGE_PROFILES).
+#
+# With template=True the file is a copy of an empty file built once per
+# process (see get_template_0_0()) and only the data and the attributes that
+# depend on it are written, which is much faster for small files; time is
+# then an unlimited dimension and the profile defaults to 'segment'.
+#
+# timedata and time_uvdata are datetimes, or numbers when time_units (and
+# time_calendar, 'standard' by default) are given, e.g. the time variable of
+# the source as read; the numbers are then rescaled to the units of the file
+# arithmetically, which is much faster for long time series.
+def writer_0_0(filename, timedata, time_uvdata, trajectorydata, segment_iddata,
+               profile_iddata, depthdata, latdata, londata, pressuredata, 
+               conductivitydata, densitydata, salinitydata, temperaturedata, udata, vdata, 
+               lat_uvdata, lon_uvdata, time_qcdata=None, u_qcdata=None, v_qcdata=None,
+               depth_qcdata=None, lat_qcdata=None, lon_qcdata=None, pressure_qcdata=None,
+               conductivity_qcdata=None, density_qcdata=None, salinity_qcdata=None,
+               temperature_qcdata=None, profile=None, template=False,
+               time_units=None, time_calendar=None, **kwargs):
+    now = t.ctime(t.time())
+
+    # Required vars list
+    req_time_vars = [depthdata, latdata, londata, pressuredata, conductivitydata, densitydata, salinitydata, temperaturedata,]
+    req_uv_vars = [udata, vdata, lat_uvdata, lon_uvdata]
+    #req_traj_vars = req_time_vars + req_uv_vars
+    quality_vars = [depth_qcdata, lat_qcdata, lon_qcdata, pressure_qcdata, conductivity_qcdata, density_qcdata, salinity_qcdata, temperature_qcdata]
+    for var in quality_vars:
+        if var is not None:
+            req_time_vars.append(var)
+            #req_traj_vars.append(var)
+
+    # Dimensions
+    time_size = len(timedata)
+    trajectory_size = len(trajectorydata)
+    time_uv_size = len(time_uvdata)
+    for var in req_time_vars:
+        if var is not None:
+            assert time_size == var.shape[0]
+    #for var in req_traj_vars:
+    #    assert trajectory_size == var.shape[1]
+    for var in req_uv_vars:
+        if var is not None:
+            assert time_uv_size == var.shape[0] 
+    dim_tuple, uv_tuple = get_dimensions_0_0(trajectory_size)
+    if template:
+        profile = profile or 'segment'
+        # The dimensions, the variables and the global attributes that don't
+        # depend on the data or the time of writing are in the template.
+        with open(filename, 'wb') as f:
+            f.write(get_template_0_0(trajectory_size, time_uv_size, profile))
+        nc = Dataset(filename, 'a')
+        global_attributes = global_attributes_0_0(now)
+        global_attributes = dict((k, global_attributes[k]) for k in DATED_ATTRIBUTES)
+    else:
+        # Name of output file (leave v.0.0 pending release of accepted spec):
+        # kerfoot@marine.rutgers.edu
+        nc = Dataset(filename,
+                     'w',
+                     format='NETCDF4_CLASSIC')
+        time = nc.createDimension('time', time_size)
+        trajectory = nc.createDimension('trajectory', trajectory_size)
+        time_uv = nc.createDimension('time_uv', time_uv_size)
+        global_attributes = global_attributes_0_0(now)
+        define_variables_0_0(nc, dim_tuple, uv_tuple, profile)
+    vars = nc.variables
+
+    # Global Attributes
+    # The coverage takes one pass over the coordinates, see CoverageStats.
+    times = get_file_times(vars['time'], timedata, time_units, time_calendar)
+    stats = CoverageStats()
+    update_coverage_stats_0_0(stats, times, latdata, londata, depthdata)
+    global_attributes.update(get_coverage_attributes_0_0(stats, vars['time']))
+    for key in kwargs.iterkeys():
+        global_attributes[key] = kwargs[key]
+    # Dictionary of global file attributes.  Use a dictionary so that we can add the
     # attributes in alphabetical order (not necessary, but makes it easier to find
     # attributes that are in alphabetical order)
-    atts = { 'serial_number' : '0098',
-             'make_model' : 'Seabird SBE 41CP',
-             'comment' : 'Slocum Glider ru29',
-             'long_name' : 'Seabird SBD 41CP Conductivity, Temperature, Depth Sensor',
-             'platform' : 'platform',
-             'calibration_date' : '2000-01-01', # ISO 8601 date
-             'factory_calibrated' : '',
-             'user_calibrated' : '',
-             'calibration_report' : '',
+    for k in sorted(global_attributes.keys()) :
+        nc.setncattr(k, global_attributes[k])
+
+    vars['time'][:] = times
+    vars['time_uv'][:] = get_file_times(vars['time_uv'], time_uvdata, time_units, time_calendar)
+    data = {'trajectory' : trajectorydata,
+            'segment_id' : segment_iddata,
+            'profile_id' : profile_iddata,
+            'depth' : depthdata,
+            'lat' : latdata,
+            'lon' : londata,
+            'pressure' : pressuredata,
+            'conductivity' : conductivitydata,
+            'density' : densitydata,
+            'salinity' : salinitydata,
+            'temperature' : temperaturedata,
+            'lat_uv' : lat_uvdata,
+            'lon_uv' : lon_uvdata,
+            'u' : udata,
+            'v' : vdata,
+            'time_qc' : time_qcdata,
+            'depth_qc' : depth_qcdata,
+            'lat_qc' : lat_qcdata,
+            'lon_qc' : lon_qcdata,
+            'pressure_qc' : pressure_qcdata,
+            'conductivity_qc' : conductivity_qcdata,
+            'density_qc' : density_qcdata,
+            'salinity_qc' : salinity_qcdata,
+            'temperature_qc' : temperature_qcdata,
+            'u_qc' : u_qcdata,
+            'v_qc' : v_qcdata,
     }
-    for k in sorted(atts.keys()):
-        instrument_ctd.setncattr(k, atts[k])
-    # ----------------------------------------------------------------------------
+    for name in sorted(data.keys()):
+        # The _qc variables are optional.
+        if data[name] is not None:
+            vars[name][:] = data[name]
 
     nc.close()
 
-def get_time_coverage(nc, stride):
-    a, b, tname = None, None, None
-    if "ocean_time" in nc.variables:
-        tname = "ocean_time"
-    if "time" in nc.variables:
-        tname = "time"
-    if tname != None:
-        a = num2date(nc.variables[tname][::stride][0], units=nc.variables[tname].units).strftime('%Y-%m-%d %H:%M UTC')
-        b = num2date(nc.variables[tname][::stride][-1], units=nc.variables[tname].units).strftime('%Y-%m-%d %H:%M UTC')
-    return a, b
+# Writer of v0.0 files that takes the time series in blocks, e.g. from a
+# generator or a real-time feed, so a whole mission never has to be in memory:
+#
+#     with GliderWriter_0_0(filename, time_uvdata, trajectorydata, udata, vdata,
+#                           lat_uvdata, lon_uvdata) as writer:
+#         for block in blocks:
+#             writer.append(**block)
+#
+# The file and its variables are created once, with an unlimited time
+# dimension, or with one of time_size records when the length of the time
+# series is known up front (the file is then laid out as by writer_0_0(), and
+# the blocks must add up to time_size records); the trajectory and the
+# depth-averaged currents (time_uv) are written up front.  Every append() writes its block after the previous one,
+# updates the geospatial_*, time_coverage_* and date_modified attributes and
+# syncs the file, so readers always see a consistent file.  Keyword arguments
+# are global attributes, data arguments may be None (absent variables) and
+# profile is the storage profile, as for writer_0_0().  With time_units (and
+# time_calendar) all times, time_uvdata and those of every append(), are
+# numbers in those units, as for writer_0_0().
+class GliderWriter_0_0(object):
 
-def get_stride(nc):
-    if nc.variables["lon"].shape[0] > 1000:
-        stride = 200
-    else:
-        stride = 1
-    return stride
+    def __init__(self, filename, time_uvdata, trajectorydata, udata, vdata,
+                 lat_uvdata, lon_uvdata, u_qcdata=None, v_qcdata=None,
+                 profile=None, time_units=None, time_calendar=None, time_size=None,
+                 **kwargs):
+        self.nc = Dataset(filename, 'w', format='NETCDF4_CLASSIC')
+        self.size = 0
+        self.time_units = time_units
+        self.time_calendar = time_calendar
+        self.trajectory_size = len(trajectorydata)
+        # Running statistics of the coverage attributes.
+        self.stats = CoverageStats()
+
+        time_uv_size = len(time_uvdata)
+        for var in [udata, vdata, lat_uvdata, lon_uvdata]:
+            if var is not None:
+                assert time_uv_size == var.shape[0]
+        self.nc.createDimension('time', time_size)
+        self.nc.createDimension('trajectory', self.trajectory_size)
+        self.nc.createDimension('time_uv', time_uv_size)
+        dim_tuple, uv_tuple = get_dimensions_0_0(self.trajectory_size)
+
+        global_attributes = global_attributes_0_0(t.ctime(t.time()))
+        global_attributes['processing_level'] = 'Written to file from ioos_glider.GliderWriter_0_0()'
+        global_attributes.update(kwargs)
+        for k in sorted(global_attributes.keys()):
+            self.nc.setncattr(k, global_attributes[k])
+
+        define_variables_0_0(self.nc, dim_tuple, uv_tuple, profile)
+
+        vars = self.nc.variables
+        vars['time_uv'][:] = get_file_times(vars['time_uv'], time_uvdata,
+                                            time_units, time_calendar)
+        data = {'trajectory' : trajectorydata,
+                'lat_uv' : lat_uvdata,
+                'lon_uv' : lon_uvdata,
+                'u' : udata,
+                'v' : vdata,
+                'u_qc' : u_qcdata,
+                'v_qc' : v_qcdata,
+        }
+        for name in sorted(data.keys()):
+            if data[name] is not None:
+                vars[name][:] = data[name]
+        self.nc.sync()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+        return False
+
+    def close(self):
+        if self.nc is not None:
+            self.nc.close()
+            self.nc = None
+
+    # Appends a block of the time series; the arguments are those of
+    # writer_0_0() along time, with the same shapes.  Returns the number of
+    # records in the file.
+    def append(self, timedata, segment_iddata, profile_iddata, depthdata, latdata,
+               londata, pressuredata, conductivitydata, densitydata, salinitydata,
+               temperaturedata, time_qcdata=None, depth_qcdata=None, lat_qcdata=None,
+               lon_qcdata=None, pressure_qcdata=None, conductivity_qcdata=None,
+               density_qcdata=None, salinity_qcdata=None, temperature_qcdata=None):
+        data = {'segment_id' : segment_iddata,
+                'profile_id' : profile_iddata,
+                'depth' : depthdata,
+                'lat' : latdata,
+                'lon' : londata,
+                'pressure' : pressuredata,
+                'conductivity' : conductivitydata,
+                'density' : densitydata,
+                'salinity' : salinitydata,
+                'temperature' : temperaturedata,
+                'time_qc' : time_qcdata,
+                'depth_qc' : depth_qcdata,
+                'lat_qc' : lat_qcdata,
+                'lon_qc' : lon_qcdata,
+                'pressure_qc' : pressure_qcdata,
+                'conductivity_qc' : conductivity_qcdata,
+                'density_qc' : density_qcdata,
+                'salinity_qc' : salinity_qcdata,
+                'temperature_qc' : temperature_qcdata,
+        }
+        size = len(timedata)
+        for name in data.keys():
+            if data[name] is not None:
+                assert size == data[name].shape[0]
+        if size == 0:
+            return self.size
 
-@app.route("/")
-def index():
-    response = \
-'''
-Here is what you do!!
-'''
-    return response
+        vars = self.nc.variables
+        block = slice(self.size, self.size + size)
+        times = get_file_times(vars['time'], timedata, self.time_units, self.time_calendar)
+        vars['time'][block] = times
+        for name in sorted(data.keys()):
+            if data[name] is not None:
+                vars[name][block] = data[name]
+        self.size += size
 
-@app.route("/geojson-line/<path:dap>")
-def geojson_line(dap):
-    return geojson(dap)
+        self._update_coverage(times, latdata, londata, depthdata)
+        self.nc.sync()
+        return self.size
 
-@app.route("/geojson/<path:dap>")
-def geojson(dap):
-    callback = request.args.get('callback', None)
-    response = "Problem"
-    with Dataset(dap) as nc:
-        stride = get_stride(nc)
-        if len(nc.variables["lon"].shape) == 2:
-            f = []
-            for i in xrange(nc.variables["lon"].shape[1]):
-                lon = nc.variables["lon"][::stride,i].flatten()
-		mask = lon.mask == False
-		lon = lon.data.astype(np.float64)
-                lat = nc.variables["lat"][::stride,i].flatten().data.astype(np.float64)
-                subbool = lon[mask]<1000
-		coords = zip(lon[mask][subbool], lat[mask][subbool])
-		#print coords
-		#coords[0], coords[1] = coords[0][coords[0]<-.01], coords[1][coords[1]>.01]
-                #coords = zip(np.ones((100,)), np.ones((100,)))
-                n = gj.LineString( coords )
-                s = getncattrs(nc)
-                if (not "time_coverage_start" in s) or (not "time_coverage_end" in s):
-                    s["time_coverage_start"], s["time_coverage_end"] = get_time_coverage(nc, stride)
-                if "trajectory" in nc.variables:
-                    f.append( gj.Feature(id=nc.variables["trajectory"][i], geometry=n, properties=s) )
-                else:
-                    f.append( gj.Feature(id=i, geometry=n, properties=s) )
-            f = gj.FeatureCollection(f)
-        else:
-            lon = nc.variables["lon"][::stride].flatten().data.astype(np.float64)
-            lat = nc.variables["lat"][::stride].flatten().data.astype(np.float64)
-            coords = zip(lon[lon<1000], lat[lat<1000])
-            #coords = zip(np.ones((100,)), np.ones((100,)))
-            n = gj.LineString( coords )
-            s = getncattrs(nc)
-            if (not "time_coverage_start" in s) or (not "time_coverage_end" in s):
-                s["time_coverage_start"], s["time_coverage_end"] = get_time_coverage(nc, stride)
-            f = gj.Feature(id=s.get("id", None), geometry=n, properties=s)
-        response = gj.dumps(f)
-        if callback != None:
-            response = callback + "(" + response + ")"
-    return Response(response, mimetype='application/json')
+    def _update_coverage(self, times, latdata, londata, depthdata):
+        update_coverage_stats_0_0(self.stats, times, latdata, londata, depthdata)
+        attributes = get_coverage_attributes_0_0(self.stats, self.nc.variables['time'])
+        for k in sorted(attributes.keys()):
+            self.nc.setncattr(k, attributes[k])
+        self.nc.setncattr('date_modified', t.ctime(t.time()))
 
+# The web service lives in geojsonservice.py, so that the reader and the
+# writers can be imported (e.g. by conversion jobs and their worker processes)
+# without loading Flask and geojson.
 if __name__ == '__main__':
+    from geojsonservice import app, start_batch_pool
+    start_batch_pool()
     app.run()
     #app.run('0.0.0.0')
@@ -0,0 +1,183 @@
+#
+# Per-request timing of the web service, aggregated for a Prometheus scrape.
+#
+# Every request gets a RequestTimer.  The code serving it times its phases
+# and counts what it handled:
+#
+#     with timer.phase("read"):
+#         lon = nc.variables["lon"][rows]
+#     timer.add("bytes_read", lon.nbytes)
+#
+# A phase entered several times adds up.  Phases may nest, the time spent in
+# an inner phase is only charged to that one, so the phases of a request never
+# add up to more than its duration.
+#
+# Once the response is complete Metrics.record() folds the timer into
+# histograms of the request and phase durations and of the response size and
+# into counters of the counts, labelled by endpoint, and render() returns
+# them in the Prometheus text format.  server_timing() is the value of a
+# Server-Timing header with the phases of one request, in milliseconds.
+#
+
+import threading
+import time
+from collections import OrderedDict
+
+# Upper bounds of the histogram buckets.
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1., 2.5, 5., 10., 30., 60.)
+SIZE_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216,
+                67108864)
+
+PREFIX = "ioos_glider_"
+
+class _Phase(object):
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+        self.t0 = None
+
+    def __enter__(self):
+        now = time.time()
+        stack = self.timer._stack
+        if stack:
+            stack[-1]._charge(now)
+        self.t0 = now
+        stack.append(self)
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        now = time.time()
+        stack = self.timer._stack
+        self._charge(now)
+        stack.pop()
+        if stack:
+            stack[-1].t0 = now
+        return False
+
+    def _charge(self, now):
+        self.timer.phases[self.name] = self.timer.phases.get(self.name, 0.) + now - self.t0
+
+class RequestTimer(object):
+
+    def __init__(self):
+        self.start = time.time()
+        # Seconds by phase, in the order the phases were first entered.
+        self.phases = OrderedDict()
+        self.counts = {}
+        # Phases entered and not yet left, innermost last.
+        self._stack = []
+
+    def phase(self, name):
+        return _Phase(self, name)
+
+    def add(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def elapsed(self):
+        return time.time() - self.start
+
+    def server_timing(self):
+        entries = ["%s;dur=%.1f" % (name, seconds * 1000.)
+                   for name, seconds in self.phases.items()]
+        entries.append("total;dur=%.1f" % (self.elapsed() * 1000.))
+        return ", ".join(entries)
+
+class _NullPhase(object):
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        return False
+
+# Stands in for the timer outside of requests (e.g. in batch workers).
+class _NullTimer(object):
+
+    _phase = _NullPhase()
+
+    def phase(self, name):
+        return self._phase
+
+    def add(self, name, value=1):
+        pass
+
+NULL_TIMER = _NullTimer()
+
+class _Histogram(object):
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+
+def _labels(labels):
+    return "{%s}" % ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                             for k, v in labels)
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metrics(object):
+
+    def __init__(self):
+        # name: {labels: _Histogram or number}, labels a tuple of (k, v).
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, status, timer):
+        endpoint = endpoint or "unknown"
+        labels = (("endpoint", endpoint),)
+        with self._lock:
+            self._observe("request_duration_seconds", labels, timer.elapsed(), DURATION_BUCKETS)
+            for name, seconds in timer.phases.items():
+                self._observe("phase_duration_seconds", labels + (("phase", name),),
+                              seconds, DURATION_BUCKETS)
+            if "bytes_returned" in timer.counts:
+                self._observe("response_bytes", labels, timer.counts["bytes_returned"], SIZE_BUCKETS)
+            self._increment("requests_total", labels + (("status", status),), 1)
+            for name, value in timer.counts.items():
+                self._increment(name + "_total", labels, value)
+
+    def _observe(self, name, labels, value, buckets):
+        series = self._histograms.setdefault(name, {})
+        if labels not in series:
+            series[labels] = _Histogram(buckets)
+        series[labels].observe(value)
+
+    def _increment(self, name, labels, value):
+        series = self._counters.setdefault(name, {})
+        series[labels] = series.get(labels, 0) + value
+
+    def render(self):
+        lines = []
+        with self._lock:
+            for name in sorted(self._counters):
+                lines.append("# TYPE %s%s counter" % (PREFIX, name))
+                for labels, value in sorted(self._counters[name].items()):
+                    lines.append("%s%s%s %s" % (PREFIX, name, _labels(labels), _number(value)))
+            for name in sorted(self._histograms):
+                lines.append("# TYPE %s%s histogram" % (PREFIX, name))
+                for labels, histogram in sorted(self._histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + (float("inf"),),
+                                            histogram.counts + [histogram.count - sum(histogram.counts)]):
+                        cumulative += count
+                        lines.append("%s%s_bucket%s %d" % (PREFIX, name, _labels(labels + (("le", _number(bound)),)),
+                                                           cumulative))
+                    lines.append("%s%s_sum%s %s" % (PREFIX, name, _labels(labels), _number(histogram.sum)))
+                    lines.append("%s%s_count%s %d" % (PREFIX, name, _labels(labels), histogram.count))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,104 @@
+#
+# In-process cache of rendered service responses.
+#
+# Entries are evicted least-recently-used first once either the number of
+# entries or the total size of the cached bodies exceeds its bound.  After
+# `ttl` seconds an entry is not dropped outright; it is handed to the
+# `revalidate(key, validator)` hook together with the validator stored when it
+# was rendered (e.g. the dataset's date_modified attribute).  If the hook says
+# the entry is still good its clock is reset, otherwise it is discarded.  The
+# entry stays cached, and is served to other requests, while it is being
+# revalidated.
+# Sizes are measured with `sizeof`, len() by default (i.e. for strings).
+#
+
+import threading
+import time
+from collections import OrderedDict
+
+class ResponseCache(object):
+
+    def __init__(self, max_entries=128, max_bytes=64*1024*1024, ttl=60.,
+                 revalidate=None, sizeof=len):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.revalidate = revalidate
+        self.sizeof = sizeof
+        self.nbytes = 0
+        self._entries = OrderedDict()
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        return self.lookup(key)[0]
+
+    # Like get(), but returns (value, validator), (None, None) on a miss.
+    def lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            # Most recently used.
+            self._entries[key] = self._entries.pop(key)
+            value, size, validator, stamp = entry
+            if self.ttl is None or time.time() - stamp <= self.ttl or key in self._revalidating:
+                # Stale entries are served while another request revalidates
+                # them.
+                return value, validator
+            self._revalidating.add(key)
+        # Ask the hook outside of the lock, it usually has to go to the DAP
+        # server for the answer.  The entry stays cached meanwhile, and is
+        # dropped if the hook fails.
+        valid = False
+        try:
+            valid = self.revalidate is not None and self.revalidate(key, validator)
+        finally:
+            with self._lock:
+                self._revalidating.discard(key)
+                # Unless the entry was replaced in the meantime.
+                if self._entries.get(key) is entry:
+                    if valid:
+                        self._entries[key] = (value, size, validator, time.time())
+                    else:
+                        del self._entries[key]
+                        self.nbytes -= size
+        if not valid:
+            return None, None
+        return value, validator
+
+    def put(self, key, value, validator=None):
+        size = self.sizeof(value)
+        if size > self.max_bytes:
+            self.invalidate(key)
+            return
+        with self._lock:
+            self._insert(key, (value, size, validator, time.time()))
+
+    def invalidate(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.nbytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+
+    def _insert(self, key, entry):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self._entries[key] = entry
+        self.nbytes += entry[1]
+        while self._entries and (len(self._entries) > self.max_entries or
+                                 self.nbytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted[1]
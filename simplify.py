@@ -0,0 +1,109 @@
+#
+# Line simplification for trajectory coordinates.
+#
+# Both methods take the lon/lat arrays of one trajectory and return the sorted
+# indices of the vertices to keep; the first and last vertex are always kept.
+# Distances and areas are planar, in degrees.
+#
+#   douglas_peucker: keeps every vertex further than `tolerance` from the
+#       simplified line; with `vertices` it refines greedily (largest
+#       deviation first) and stops at that many vertices.
+#   visvalingam: repeatedly drops the vertices whose triangle with their
+#       neighbours has the smallest area, until every remaining triangle is
+#       larger than tolerance**2 and at most `vertices` vertices are left.
+#       Each round drops a batch of non-adjacent vertices at once.
+#
+
+import heapq
+import numpy as np
+
+METHODS = ("dp", "vw")
+
+def _deviation(x, y, a, b):
+    # Index and distance of the vertex between a and b furthest from the
+    # chord a-b.
+    if b - a < 2:
+        return a, 0.
+    px, py = x[a+1:b] - x[a], y[a+1:b] - y[a]
+    dx, dy = x[b] - x[a], y[b] - y[a]
+    norm = np.hypot(dx, dy)
+    if norm == 0.:
+        d = np.hypot(px, py)
+    else:
+        d = np.abs(px * dy - py * dx) / norm
+    i = int(np.argmax(d))
+    return a + 1 + i, float(d[i])
+
+def douglas_peucker(x, y, tolerance=None, vertices=None):
+    x, y = np.asarray(x, np.float64), np.asarray(y, np.float64)
+    n = len(x)
+    if n < 3 or (vertices is not None and vertices >= n):
+        return np.arange(n)
+    keep = np.zeros(n, bool)
+    keep[0] = keep[-1] = True
+    if vertices is None:
+        stack = [(0, n - 1)]
+        while stack:
+            a, b = stack.pop()
+            i, d = _deviation(x, y, a, b)
+            if d > tolerance:
+                keep[i] = True
+                stack.append((a, i))
+                stack.append((i, b))
+    else:
+        i, d = _deviation(x, y, 0, n - 1)
+        heap = [(-d, 0, n - 1, i)]
+        kept = 2
+        while heap and kept < vertices:
+            d, a, b, i = heapq.heappop(heap)
+            if tolerance is not None and -d <= tolerance:
+                break
+            if -d <= 0.:
+                break
+            keep[i] = True
+            kept += 1
+            for a, b in ((a, i), (i, b)):
+                j, d = _deviation(x, y, a, b)
+                if d > 0.:
+                    heapq.heappush(heap, (-d, a, b, j))
+    return np.flatnonzero(keep)
+
+def visvalingam(x, y, tolerance=None, vertices=None):
+    x, y = np.asarray(x, np.float64), np.asarray(y, np.float64)
+    idx = np.arange(len(x))
+    area_min = 0. if tolerance is None else tolerance ** 2
+    while len(idx) > 2:
+        kx, ky = x[idx], y[idx]
+        area = 0.5 * np.abs((kx[:-2] - kx[2:]) * (ky[1:-1] - ky[:-2]) -
+                            (kx[:-2] - kx[1:-1]) * (ky[2:] - ky[:-2]))
+        candidate = area < area_min
+        excess = len(idx) - 2
+        if not candidate.any():
+            if vertices is None or len(idx) <= vertices:
+                break
+            candidate[:] = True
+            excess = len(idx) - vertices
+        if candidate.sum() > excess:
+            cutoff = np.partition(area[candidate], excess - 1)[excess - 1]
+            candidate &= area <= cutoff
+        # Neighbouring areas depend on each other, so only every other vertex
+        # of a run of candidates goes in the same round.
+        pos = np.arange(len(area))
+        first = candidate & ~np.concatenate(([False], candidate[:-1]))
+        run = np.maximum.accumulate(np.where(first, pos, 0))
+        drop = np.flatnonzero(candidate & ((pos - run) % 2 == 0))
+        if len(drop) == 0:
+            break
+        if len(drop) > excess:
+            drop = drop[np.argsort(area[drop], kind="mergesort")[:excess]]
+        idx = np.delete(idx, drop + 1)
+    return idx
+
+def simplify(x, y, method="dp", tolerance=None, vertices=None):
+    if tolerance is None and vertices is None:
+        return np.arange(len(x))
+    if method == "dp":
+        return douglas_peucker(x, y, tolerance, vertices)
+    elif method == "vw":
+        return visvalingam(x, y, tolerance, vertices)
+    raise ValueError("Unknown simplification method %r" % (method,))
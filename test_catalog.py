@@ -0,0 +1,97 @@
+#
+# The packed R-tree and the pieces of catalog.py against brute force.
+#
+
+import unittest
+import numpy as np
+from catalog import TrajectoryIndex, Catalog, get_pieces
+
+def random_boxes(rng, n):
+    lo = rng.uniform(-100., 100., (n, 3))
+    return np.hstack((lo, lo + rng.uniform(0., 10., (n, 3))))
+
+def brute_force(boxes, box):
+    return np.flatnonzero(np.all((boxes[:, :3] <= box[3:]) & (boxes[:, 3:] >= box[:3]), axis=1))
+
+class TrajectoryIndexTest(unittest.TestCase):
+
+    def test_query(self):
+        rng = np.random.RandomState(0)
+        for n in (0, 1, 15, 16, 17, 1000):
+            boxes = random_boxes(rng, n)
+            index = TrajectoryIndex(boxes, node_size=4)
+            self.assertEqual(len(index), n)
+            for box in random_boxes(rng, 50):
+                self.assertEqual(index.query(box).tolist(), brute_force(boxes, box).tolist())
+
+    def test_unbounded_query(self):
+        boxes = random_boxes(np.random.RandomState(1), 100)
+        index = TrajectoryIndex(boxes)
+        box = [-np.inf] * 3 + [np.inf] * 3
+        self.assertEqual(index.query(box).tolist(), list(range(100)))
+
+class PiecesTest(unittest.TestCase):
+
+    def test_pieces_cover_points_and_segments(self):
+        rng = np.random.RandomState(2)
+        lon, lat = rng.uniform(-180., 180., 1000), rng.uniform(-90., 90., 1000)
+        times = np.arange(1000.)
+        pieces = np.array(get_pieces(lon, lat, times, 64))
+        self.assertEqual(len(pieces), 16)
+        for i in range(len(lon) - 1):
+            # Both ends of every segment are in the same piece.
+            piece = pieces[i // 64]
+            for j in (i, i + 1):
+                self.assertTrue(piece[0] <= lon[j] <= piece[3])
+                self.assertTrue(piece[1] <= lat[j] <= piece[4])
+                self.assertTrue(piece[2] <= times[j] <= piece[5])
+
+    def test_unknown_times(self):
+        pieces = get_pieces([0., 1.], [0., 1.], [np.nan, np.nan], 16)
+        self.assertEqual(pieces, [[0., 0., None, 1., 1., None]])
+
+class CatalogTest(unittest.TestCase):
+
+    def make_catalog(self, tracks):
+        catalog = Catalog()
+        for url, id, lon, lat, times in tracks:
+            entry = catalog.get(url) or {"date_modified": None, "ingested": None, "trajectories": []}
+            entry["trajectories"].append({"id": id, "pieces": get_pieces(lon, lat, times, 4)})
+            catalog.put(url, entry)
+        return catalog
+
+    def test_query(self):
+        rng = np.random.RandomState(3)
+        tracks = []
+        for n in range(50):
+            lon = np.cumsum(rng.uniform(-1., 1., 40)) + rng.uniform(-180., 180.)
+            lat = np.cumsum(rng.uniform(-1., 1., 40)) + rng.uniform(-60., 60.)
+            times = np.arange(40.) + rng.uniform(0., 1000.)
+            tracks.append(("dataset%d" % (n % 5), n, lon, lat, times))
+        catalog = self.make_catalog(tracks)
+        for bbox, start, end in (((-20., -20., 20., 20.), None, None),
+                                 ((170., -60., -170., 60.), None, None),
+                                 (None, 200., 400.),
+                                 ((-90., -30., 90., 30.), 500., None)):
+            expected = set()
+            for url, id, lon, lat, times in tracks:
+                # A match is exact up to the pieces, so compare with them.
+                for piece in get_pieces(lon, lat, times, 4):
+                    in_time = ((start is None or piece[5] >= start) and
+                               (end is None or piece[2] <= end))
+                    if bbox is None:
+                        in_box = True
+                    elif bbox[0] <= bbox[2]:
+                        in_box = piece[3] >= bbox[0] and piece[0] <= bbox[2]
+                    else:
+                        in_box = piece[3] >= bbox[0] or piece[0] <= bbox[2]
+                    if bbox is not None:
+                        in_box = in_box and piece[4] >= bbox[1] and piece[1] <= bbox[3]
+                    if in_time and in_box:
+                        expected.add((url, id))
+            matches = set((url, t["id"]) for url, t in catalog.query(bbox, start, end))
+            self.assertTrue(expected)
+            self.assertEqual(matches, expected)
+
+if __name__ == '__main__':
+    unittest.main()
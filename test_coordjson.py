@@ -0,0 +1,58 @@
+#
+# The coordinate JSON and encoded polylines of coordjson.py, parsed back.
+#
+
+import json
+import unittest
+import numpy as np
+from coordjson import dumps_coords, encode_polyline
+
+def decode_polyline(text):
+    values, value, shift = [], 0, 0
+    for c in text:
+        b = ord(c) - 63
+        value |= (b & 0x1f) << shift
+        shift += 5
+        if not b & 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    latlon = np.cumsum(np.array(values, np.int64).reshape(-1, 2), axis=0)
+    return latlon[:, 1], latlon[:, 0]
+
+class DumpsCoordsTest(unittest.TestCase):
+
+    def test_precision(self):
+        rng = np.random.RandomState(0)
+        lon, lat = rng.uniform(-180., 180., 1000), rng.uniform(-90., 90., 1000)
+        lon[:4] = [0., -0., 1e-9, -1e-9]
+        lat[:4] = [90., -90., 0.5, -10.]
+        for precision in (0, 1, 5, 10):
+            coords = np.array(json.loads(dumps_coords(lon, lat, precision)))
+            np.testing.assert_array_equal(coords[:, 0], np.round(lon, precision))
+            np.testing.assert_array_equal(coords[:, 1], np.round(lat, precision))
+
+    def test_no_precision(self):
+        lon, lat = np.array([-70.123456789012, 1e-20]), np.array([40.5, -0.1])
+        coords = json.loads(dumps_coords(lon, lat))
+        self.assertEqual(coords, [[lon[0], lat[0]], [lon[1], lat[1]]])
+
+    def test_empty(self):
+        self.assertEqual(dumps_coords([], []), "[]")
+
+class PolylineTest(unittest.TestCase):
+
+    def test_example(self):
+        # The example of the format's documentation.
+        lon, lat = np.array([-120.2, -120.95, -126.453]), np.array([38.5, 40.7, 43.252])
+        self.assertEqual(encode_polyline(lon, lat), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    def test_round_trip(self):
+        rng = np.random.RandomState(1)
+        lon, lat = rng.uniform(-180., 180., 500), rng.uniform(-90., 90., 500)
+        for precision in (5, 6):
+            dlon, dlat = decode_polyline(encode_polyline(lon, lat, precision))
+            np.testing.assert_array_equal(dlon, np.rint(lon * 10 ** precision))
+            np.testing.assert_array_equal(dlat, np.rint(lat * 10 ** precision))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+#
+# CoverageStats of coveragestats.py against NumPy over the valid values.
+#
+
+import unittest
+import numpy as np
+import coveragestats
+from coveragestats import CoverageStats
+
+FILL = -999.
+
+def random_block(rng, shape, dtype=np.float64):
+    data = rng.uniform(-100., 100., shape).astype(dtype)
+    flat = data.ravel()
+    n = flat.size
+    if data.dtype.kind == "f":
+        flat[rng.randint(0, n, n // 10)] = np.nan
+        flat[rng.randint(0, n, n // 20)] = np.inf
+        flat[rng.randint(0, n, n // 20)] = -np.inf
+    flat[rng.randint(0, n, n // 10)] = FILL
+    return np.ma.masked_array(data, mask=rng.uniform(size=shape) < 0.1)
+
+def valid_values(data):
+    values = np.ma.filled(data.astype(np.float64), np.nan).ravel()
+    return values[np.isfinite(values) & (values != FILL)]
+
+class CoverageStatsTest(unittest.TestCase):
+
+    def check(self, stats, name, blocks):
+        values = np.concatenate([valid_values(b) for b in blocks])
+        self.assertEqual(stats.counts[name], len(values))
+        self.assertEqual(stats.sizes[name], sum(b.size for b in blocks))
+        if len(values):
+            self.assertEqual(stats.extent(name), (np.nanmin(values), np.nanmax(values)))
+        else:
+            self.assertEqual(stats.extent(name), None)
+
+    def test_blocks(self):
+        rng = np.random.RandomState(0)
+        for shape, dtype in (((1000,), np.float64), ((300, 7), np.float32), ((500, 3), np.int32)):
+            blocks = [random_block(rng, shape, dtype) for _ in range(5)]
+            appended, whole = CoverageStats(), CoverageStats()
+            for block in blocks:
+                appended.update("x", block, FILL)
+            whole.update("x", np.ma.concatenate(blocks), FILL)
+            self.check(appended, "x", blocks)
+            self.check(whole, "x", blocks)
+            self.assertEqual(appended.extent("x"), whole.extent("x"))
+            self.assertEqual(appended.counts, whole.counts)
+
+    def test_larger_than_block_size(self):
+        rng = np.random.RandomState(1)
+        block = random_block(rng, (3 * coveragestats.BLOCK_SIZE + 5,))
+        stats = CoverageStats()
+        stats.update("x", block, FILL)
+        self.check(stats, "x", [block])
+
+    def test_no_valid_values(self):
+        stats = CoverageStats()
+        stats.update("x", np.array([np.nan, np.inf, FILL]), FILL)
+        stats.update("x", np.ma.masked_array([1., 2.], mask=True), FILL)
+        stats.update("x", np.zeros(0))
+        self.assertEqual(stats.extent("x"), None)
+        self.assertEqual(stats.counts["x"], 0)
+        self.assertEqual(stats.sizes["x"], 5)
+
+    def test_without_fill_value(self):
+        stats = CoverageStats()
+        stats.update("x", np.array([FILL, 1., np.nan]))
+        self.assertEqual(stats.extent("x"), (FILL, 1.))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+#
+# Time conversion of ioos_glider.py against a round trip through dates, and
+# the coverage attributes of the v0.0 writers.
+#
+
+import unittest
+import numpy as np
+from netCDF4 import num2date, date2num
+from ioos_glider import (convert_time, time_to_unix, update_coverage_stats_0_0,
+                         get_coverage_attributes_0_0, NC_FILL_VALUES)
+from coveragestats import CoverageStats
+
+def convert_by_dates(values, units, calendar, to_units, to_calendar):
+    return date2num(num2date(values, units=units, calendar=calendar),
+                    units=to_units, calendar=to_calendar)
+
+class ConvertTimeTest(unittest.TestCase):
+
+    def test_rescaled_as_dates(self):
+        rng = np.random.RandomState(0)
+        units = ["seconds since 1970-01-01 00:00:00",
+                 "seconds since 2013-08-20 12:30:00",
+                 "minutes since 1900-01-01",
+                 "hours since 2000-01-01 06:00:00",
+                 "days since 1858-11-17 00:00:00",
+                 "days since 0001-01-01"]
+        for calendar, to_calendar in (("standard", "standard"),
+                                      ("gregorian", "proleptic_gregorian"),
+                                      ("noleap", "noleap"),
+                                      ("360_day", "360_day")):
+            # Before 1582 the Gregorian calendars don't agree.
+            pairs = units[:-1] if calendar != to_calendar else units
+            for from_units in pairs:
+                for to_units in pairs:
+                    values = np.round(rng.uniform(0., 1e5, 100), 3)
+                    expected = convert_by_dates(values, from_units, calendar, to_units, to_calendar)
+                    scale = float(np.abs(expected).max()) or 1.
+                    np.testing.assert_allclose(
+                        convert_time(values, from_units, calendar, to_units, to_calendar),
+                        expected, rtol=0, atol=scale * 1e-12, err_msg="%s -> %s, %s" %
+                        (from_units, to_units, calendar))
+
+    def test_masked(self):
+        values = np.ma.masked_array([0., 1., 2.], mask=[False, True, False])
+        # Offset and scale.
+        times = convert_time(values, "days since 1970-01-01", "standard", "seconds since 1970-01-01", "standard")
+        np.testing.assert_array_equal(times, [0., np.nan, 172800.])
+        # Through dates: different calendars and months.
+        times = convert_time(values, "days since 2000-01-01", "noleap", "days since 2000-01-01", "standard")
+        np.testing.assert_array_equal(times, [0., np.nan, 2.])
+        times = convert_time(values, "months since 2000-01-01", "360_day", "days since 2000-01-01", "360_day")
+        np.testing.assert_array_equal(times, [0., np.nan, 60.])
+
+    def test_time_to_unix(self):
+        times = time_to_unix(np.array([0., 1.5]), "hours since 2013-01-01 00:00:00")
+        np.testing.assert_array_equal(times, [1356998400., 1357003800.])
+
+class TimeVariable(object):
+    units = "seconds since 1970-01-01 00:00:00"
+    calendar = "gregorian"
+
+class CoverageAttributesTest(unittest.TestCase):
+
+    def test_attributes(self):
+        stats = CoverageStats()
+        times = np.array([1356998400. + 86400., np.nan, 1356998400.])
+        lat = np.ma.masked_array([40., 41., 90.], mask=[False, False, True])
+        lon = np.array([-70., np.nan, -71.])
+        depth = np.array([5., NC_FILL_VALUES['f8'], 1.])
+        update_coverage_stats_0_0(stats, times, lat, lon, depth)
+        attributes = get_coverage_attributes_0_0(stats, TimeVariable)
+        self.assertEqual(attributes, {
+            'geospatial_lat_min': 40., 'geospatial_lat_max': 41.,
+            'geospatial_lon_min': -71., 'geospatial_lon_max': -70.,
+            'geospatial_vertical_min': 1., 'geospatial_vertical_max': 5.,
+            'time_coverage_start': '2013-01-01 00:00 UTC',
+            'time_coverage_end': '2013-01-02 00:00 UTC'})
+
+    def test_no_valid_values(self):
+        stats = CoverageStats()
+        nan = np.array([np.nan])
+        update_coverage_stats_0_0(stats, nan, nan, nan, nan)
+        self.assertEqual(get_coverage_attributes_0_0(stats, TimeVariable), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+#
+# Eviction, expiry and revalidation of responsecache.py.
+#
+
+import threading
+import time
+import unittest
+from responsecache import ResponseCache
+
+class ResponseCacheTest(unittest.TestCase):
+
+    def test_evicts_least_recently_used(self):
+        cache = ResponseCache(max_entries=3, ttl=None)
+        for key in "abc":
+            cache.put(key, key * 10)
+        cache.get("a")
+        cache.put("d", "d" * 10)
+        self.assertEqual(sorted(cache._entries), ["a", "c", "d"])
+        self.assertEqual(cache.nbytes, 30)
+
+    def test_evicts_by_size(self):
+        cache = ResponseCache(max_bytes=25, ttl=None)
+        cache.put("a", "a" * 10)
+        cache.put("b", "b" * 10)
+        cache.put("c", "c" * 10)
+        self.assertEqual(list(cache._entries), ["b", "c"])
+        self.assertEqual(cache.nbytes, 20)
+
+    def test_put_replaces(self):
+        cache = ResponseCache(ttl=None)
+        cache.put("a", "a" * 10)
+        cache.put("b", "b" * 10)
+        cache.put("a", "a" * 5)
+        self.assertEqual(list(cache._entries), ["b", "a"])
+        self.assertEqual(cache.nbytes, 15)
+
+    def test_put_too_large(self):
+        cache = ResponseCache(max_bytes=10, ttl=None)
+        cache.put("a", "a" * 10)
+        cache.put("a", "a" * 11)
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_ttl(self):
+        checked = []
+        def revalidate(key, validator):
+            checked.append((key, validator))
+            return validator == "v1"
+        cache = ResponseCache(ttl=0.01, revalidate=revalidate)
+        cache.put("a", "aaa", "v1")
+        cache.put("b", "bbb", "v2")
+        self.assertEqual(cache.lookup("a"), ("aaa", "v1"))
+        self.assertEqual(checked, [])
+        time.sleep(0.02)
+        self.assertEqual(cache.lookup("a"), ("aaa", "v1"))
+        self.assertEqual(cache.lookup("b"), (None, None))
+        self.assertEqual(checked, [("a", "v1"), ("b", "v2")])
+        # Revalidated entries are fresh again, failed ones are dropped.
+        self.assertEqual(cache.lookup("a"), ("aaa", "v1"))
+        self.assertEqual(len(checked), 2)
+        self.assertFalse("b" in cache)
+        self.assertEqual(cache.nbytes, 3)
+
+    def test_expires_without_hook(self):
+        cache = ResponseCache(ttl=0.01)
+        cache.put("a", "aaa")
+        time.sleep(0.02)
+        self.assertEqual(cache.get("a"), None)
+        self.assertEqual(cache.nbytes, 0)
+
+    def test_served_while_revalidating(self):
+        started, done = threading.Event(), threading.Event()
+        def revalidate(key, validator):
+            started.set()
+            done.wait()
+            return True
+        cache = ResponseCache(ttl=0.01, revalidate=revalidate)
+        cache.put("a", "aaa")
+        time.sleep(0.02)
+        results = []
+        thread = threading.Thread(target=lambda: results.append(cache.get("a")))
+        thread.start()
+        started.wait()
+        self.assertEqual(cache.get("a"), "aaa")
+        # Replaced while it was being revalidated: the new entry is kept.
+        cache.put("a", "bbbb")
+        done.set()
+        thread.join()
+        self.assertEqual(results, ["aaa"])
+        self.assertEqual(cache.get("a"), "bbbb")
+        self.assertEqual(cache.nbytes, 4)
+
+if __name__ == '__main__':
+    unittest.main()
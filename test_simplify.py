@@ -0,0 +1,103 @@
+#
+# Properties of the line simplifications of simplify.py on random walks.
+#
+
+import unittest
+import numpy as np
+from simplify import simplify, douglas_peucker, visvalingam, METHODS
+
+def random_walk(rng, n):
+    return np.cumsum(rng.normal(size=n)), np.cumsum(rng.normal(size=n))
+
+# Distance of every vertex between two kept ones from the line through them,
+# the distance Douglas-Peucker bounds.
+def deviations(x, y, keep):
+    d = np.zeros(len(x))
+    for a, b in zip(keep[:-1], keep[1:]):
+        px, py = x[a:b + 1] - x[a], y[a:b + 1] - y[a]
+        dx, dy = x[b] - x[a], y[b] - y[a]
+        norm = np.hypot(dx, dy)
+        if norm == 0.:
+            d[a:b + 1] = np.hypot(px, py)
+        else:
+            d[a:b + 1] = np.abs(px * dy - py * dx) / norm
+    return d
+
+def triangle_areas(x, y):
+    return 0.5 * np.abs((x[:-2] - x[2:]) * (y[1:-1] - y[:-2]) -
+                        (x[:-2] - x[1:-1]) * (y[2:] - y[:-2]))
+
+class SimplifyTest(unittest.TestCase):
+
+    def check_index(self, keep, n):
+        self.assertEqual(keep[0], 0)
+        self.assertEqual(keep[-1], n - 1)
+        self.assertTrue(np.all(np.diff(keep) > 0))
+
+    def test_vertices(self):
+        rng = np.random.RandomState(0)
+        x, y = random_walk(rng, 1000)
+        for method in METHODS:
+            for vertices in (2, 3, 10, 100, 999, 1000, 5000):
+                keep = simplify(x, y, method, vertices=vertices)
+                self.check_index(keep, len(x))
+                self.assertTrue(len(keep) <= vertices, (method, vertices))
+                self.assertEqual(len(keep), min(vertices, len(x)), (method, vertices))
+
+    def test_tolerance_and_vertices(self):
+        rng = np.random.RandomState(1)
+        x, y = random_walk(rng, 1000)
+        for method in METHODS:
+            only_tolerance = simplify(x, y, method, tolerance=0.5)
+            keep = simplify(x, y, method, tolerance=0.5, vertices=50)
+            self.check_index(keep, len(x))
+            self.assertTrue(len(keep) <= 50)
+            keep = simplify(x, y, method, tolerance=0.5, vertices=len(only_tolerance) + 100)
+            self.assertTrue(len(keep) <= len(only_tolerance))
+
+    def test_douglas_peucker_tolerance(self):
+        rng = np.random.RandomState(2)
+        for n in (3, 10, 1000):
+            x, y = random_walk(rng, n)
+            for tolerance in (0.01, 0.5, 5.):
+                keep = douglas_peucker(x, y, tolerance)
+                self.check_index(keep, n)
+                self.assertTrue(deviations(x, y, keep).max() <= tolerance)
+
+    def test_visvalingam_tolerance(self):
+        rng = np.random.RandomState(3)
+        x, y = random_walk(rng, 1000)
+        for tolerance in (0.01, 0.5, 5.):
+            keep = visvalingam(x, y, tolerance)
+            self.check_index(keep, len(x))
+            # Every vertex left spans a triangle of at least tolerance**2.
+            self.assertTrue(triangle_areas(x[keep], y[keep]).min() >= tolerance ** 2)
+
+    def test_collinear(self):
+        x = np.linspace(0., 10., 50)
+        for method in METHODS:
+            self.assertEqual(simplify(x, 2. * x, method, tolerance=1e-6).tolist(), [0, 49])
+            keep = simplify(x, 2. * x, method, vertices=10)
+            self.check_index(keep, len(x))
+            self.assertTrue(len(keep) <= 10)
+
+    def test_repeated_points(self):
+        x, y = np.zeros(20), np.zeros(20)
+        for method in METHODS:
+            keep = simplify(x, y, method, tolerance=0.1)
+            self.assertEqual(keep.tolist(), [0, 19])
+
+    def test_short_lines(self):
+        for n in (0, 1, 2):
+            x, y = np.arange(n, dtype=float), np.arange(n, dtype=float)
+            for method in METHODS:
+                self.assertEqual(simplify(x, y, method, tolerance=1.).tolist(), list(range(n)))
+                self.assertEqual(simplify(x, y, method, vertices=1).tolist(), list(range(n)))
+
+    def test_nothing_to_simplify(self):
+        x, y = random_walk(np.random.RandomState(4), 10)
+        self.assertEqual(simplify(x, y, "vw").tolist(), list(range(10)))
+        self.assertRaises(ValueError, simplify, x, y, "nope", 1.)
+
+if __name__ == '__main__':
+    unittest.main()
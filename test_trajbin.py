@@ -0,0 +1,51 @@
+#
+# Round trips of the binary trajectory format of trajbin.py.
+#
+
+import struct
+import unittest
+import numpy as np
+import trajbin
+
+class TrajbinTest(unittest.TestCase):
+
+    def pack(self, trajectories, dtype):
+        return trajbin.pack_header(len(trajectories), dtype) + b"".join(
+            trajbin.pack_trajectory(id, lon, lat, time, dtype)
+            for id, lon, lat, time in trajectories)
+
+    def test_round_trip(self):
+        rng = np.random.RandomState(0)
+        for dtype in ("f4", "f8"):
+            trajectories = []
+            for n, id in ((5, 0), (0, "empty"), (3, None), (7, u"gl\xfcder-1"), (1, "abcdefgh")):
+                time = np.arange(n, dtype=np.float64) + 1.4e9
+                if n:
+                    time[-1] = np.nan
+                trajectories.append((id, rng.uniform(-180., 180., n), rng.uniform(-90., 90., n), time))
+            unpacked = trajbin.unpack(self.pack(trajectories, dtype))
+            self.assertEqual(len(unpacked), len(trajectories))
+            for (id, lon, lat, time), (uid, ulon, ulat, utime) in zip(trajectories, unpacked):
+                self.assertEqual(uid, u"" if id is None else u"%s" % (id,))
+                self.assertEqual(ulon.dtype, np.dtype("<" + dtype))
+                np.testing.assert_array_equal(ulon, lon.astype(dtype))
+                np.testing.assert_array_equal(ulat, lat.astype(dtype))
+                np.testing.assert_array_equal(utime, time)
+
+    def test_alignment(self):
+        lon, lat, time = np.zeros(3), np.zeros(3), np.zeros(3)
+        data = trajbin.pack_header(1, "f4") + trajbin.pack_trajectory("abc", lon, lat, time, "f4")
+        self.assertEqual(len(data) % 8, 0)
+        (_, ulon, ulat, utime), = trajbin.unpack(data)
+        self.assertEqual(len(ulon), 3)
+        # The arrays are views of the buffer at the aligned offsets.
+        base = np.frombuffer(data, np.uint8).ctypes.data
+        for a, size in ((ulon, 8), (ulat, 4), (utime, 8)):
+            self.assertEqual((a.ctypes.data - base) % size, 0)
+
+    def test_bad_magic(self):
+        data = struct.pack("<4sHHII", b"NOPE", trajbin.VERSION, 4, 0, 0)
+        self.assertRaises(ValueError, trajbin.unpack, data)
+
+if __name__ == '__main__':
+    unittest.main()
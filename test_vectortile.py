@@ -0,0 +1,115 @@
+#
+# Round trips of the vector tiles of vectortile.py through a minimal protobuf
+# decoder.
+#
+
+import unittest
+import numpy as np
+from vectortile import build_pyramid, encode_tile, mercator, _varints, MOVE_TO, LINE_TO
+
+def read_varint(data, offset):
+    value, shift = 0, 0
+    while True:
+        b = ord(data[offset:offset + 1])
+        value |= (b & 0x7f) << shift
+        offset += 1
+        shift += 7
+        if not b & 0x80:
+            return value, offset
+
+# (field number, value) of a message; length delimited values are bytes.
+def read_fields(data):
+    fields, offset = [], 0
+    while offset < len(data):
+        key, offset = read_varint(data, offset)
+        if key & 7 == 0:
+            value, offset = read_varint(data, offset)
+        elif key & 7 == 2:
+            n, offset = read_varint(data, offset)
+            value, offset = data[offset:offset + n], offset + n
+        else:
+            raise ValueError("Unexpected wire type %d" % (key & 7))
+        fields.append((key >> 3, value))
+    return fields
+
+def read_varints(data):
+    values, offset = [], 0
+    while offset < len(data):
+        value, offset = read_varint(data, offset)
+        values.append(value)
+    return values
+
+def unzigzag(v):
+    return (v >> 1) ^ -(v & 1)
+
+# Lines (lists of (x, y) tile coordinates) of a LineString geometry.
+def decode_geometry(data):
+    values = read_varints(data)
+    lines, x, y, i = [], 0, 0, 0
+    while i < len(values):
+        command, count = values[i] & 7, values[i] >> 3
+        i += 1
+        if command == MOVE_TO:
+            lines.append([])
+        for _ in range(count):
+            x += unzigzag(values[i])
+            y += unzigzag(values[i + 1])
+            i += 2
+            lines[-1].append((x, y))
+    return lines
+
+# {id: lines} of the features of the layer of a tile.
+def decode_tile(data):
+    layers = [read_fields(v) for k, v in read_fields(data) if k == 3]
+    features = {}
+    for layer in layers:
+        for k, v in layer:
+            if k != 2:
+                continue
+            feature = dict(read_fields(v))
+            features[feature.get(1)] = decode_geometry(feature[4])
+    return features
+
+def tile_coords(lon, lat, z, x, y, extent=4096):
+    mx, my = mercator(lon, lat)
+    n = 2 ** z
+    return np.rint((mx * n - x) * extent), np.rint((my * n - y) * extent)
+
+class VectorTileTest(unittest.TestCase):
+
+    def test_varints(self):
+        values = np.array([0, 1, 127, 128, 300, 2 ** 32, 2 ** 63 + 5], np.uint64)
+        self.assertEqual(read_varints(_varints(values)), [int(v) for v in values])
+
+    def test_line_inside_tile(self):
+        lon, lat = np.array([-10., -9., -8.]), np.array([10., 10.5, 10.])
+        pyramid = build_pyramid([(7, lon, lat)], max_zoom=6)
+        z, x, y = 6, 30, 30
+        features = decode_tile(encode_tile(pyramid, z, x, y))
+        self.assertEqual(list(features), [7])
+        tx, ty = tile_coords(lon, lat, z, x, y)
+        self.assertEqual(features[7], [list(zip(tx.astype(int), ty.astype(int)))])
+
+    def test_segment_crossing_tile(self):
+        # Both ends of the only segment are outside of the tile.
+        lon, lat = np.array([-30., 30.]), np.array([10., 10.])
+        pyramid = build_pyramid([(1, lon, lat)], max_zoom=4)
+        features = decode_tile(encode_tile(pyramid, 4, 7, 7))
+        self.assertEqual(len(features[1]), 1)
+        (x0, y0), (x1, y1) = features[1][0]
+        ty = tile_coords(lon, lat, 4, 7, 7)[1][0]
+        self.assertEqual((x0, x1), (-64, 4096 + 64))
+        self.assertEqual((y0, y1), (ty, ty))
+
+    def test_line_leaving_and_entering_tile(self):
+        lon, lat = np.array([-20., -20., -2., -2.]), np.array([10., 30., 30., 10.])
+        pyramid = build_pyramid([(1, lon, lat)], max_zoom=4)
+        features = decode_tile(encode_tile(pyramid, 4, 7, 7))
+        self.assertEqual(len(features[1]), 2)
+
+    def test_empty_tile(self):
+        pyramid = build_pyramid([(1, np.array([-10., -9.]), np.array([10., 10.]))], max_zoom=4)
+        self.assertEqual(encode_tile(pyramid, 4, 0, 0), b"")
+
+if __name__ == '__main__':
+    unittest.main()
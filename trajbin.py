@@ -0,0 +1,65 @@
+#
+# Compact binary trajectory format.
+#
+# Everything is little-endian, and every array starts on a boundary of its
+# value size so that clients can view the buffers directly (e.g. as a
+# Float32Array or Float64Array): lon and time on an 8 byte boundary, lat right
+# after lon, on a 4 byte boundary with f4 values.
+#
+#   header (16 bytes)
+#     magic       4s   b"GTRJ"
+#     version     u2   1
+#     value size  u2   4 or 8, the size of the lon/lat values
+#     count       u4   number of trajectories
+#     reserved    u4
+#   per trajectory
+#     points      u4   n
+#     id length   u4   bytes of the utf-8 id (0 if there is none)
+#     id               padded with zeros to a multiple of 8
+#     lon              n float32 or float64, degrees_east
+#     lat              n float32 or float64, degrees_north, padded to 8
+#     time             n float64, seconds since 1970-01-01 UTC (NaN if unknown)
+#
+
+import struct
+import numpy as np
+
+MAGIC = b"GTRJ"
+VERSION = 1
+
+def _pad(nbytes):
+    return b"\0" * (-nbytes % 8)
+
+def pack_header(count, dtype):
+    return struct.pack("<4sHHII", MAGIC, VERSION, np.dtype(dtype).itemsize, count, 0)
+
+def pack_trajectory(id, lon, lat, time, dtype):
+    dtype = np.dtype(dtype).newbyteorder("<")
+    if id is None:
+        id = b""
+    elif not isinstance(id, bytes):
+        id = (u"%s" % (id,)).encode("utf-8")
+    coords = np.asarray(lon, dtype).tobytes() + np.asarray(lat, dtype).tobytes()
+    return b"".join((struct.pack("<II", len(lon), len(id)), id, _pad(len(id)),
+                     coords, _pad(len(coords)),
+                     np.asarray(time, "<f8").tobytes()))
+
+def unpack(data):
+    magic, version, size, count, _ = struct.unpack_from("<4sHHII", data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a version %d trajectory buffer" % VERSION)
+    dtype = np.dtype("<f%d" % size)
+    offset, trajectories = 16, []
+    for _ in range(count):
+        n, idlen = struct.unpack_from("<II", data, offset)
+        offset += 8
+        id = data[offset:offset + idlen].decode("utf-8")
+        offset += idlen + (-idlen % 8)
+        lon = np.frombuffer(data, dtype, n, offset)
+        lat = np.frombuffer(data, dtype, n, offset + n * size)
+        offset += 2 * n * size
+        offset += -offset % 8
+        time = np.frombuffer(data, "<f8", n, offset)
+        offset += n * 8
+        trajectories.append((id, lon, lat, time))
+    return trajectories
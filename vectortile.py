@@ -0,0 +1,166 @@
+#
+# Mapbox Vector Tiles (v2) of trajectory lines.
+#
+# build_pyramid() projects the lines to Web Mercator (on the unit square) and
+# simplifies them once per zoom level, to half a pixel of a 256 pixel tile,
+# each level from the next finer one.  encode_tile() then clips the lines of
+# the matching level to one tile (plus a buffer) and writes the protobuf
+# directly; the varints of the geometry are packed with NumPy.
+#
+
+import numpy as np
+from simplify import douglas_peucker
+
+MAX_LAT = 85.0511287798
+TILE_SIZE = 256
+
+def mercator(lon, lat):
+    lat = np.radians(np.clip(lat, -MAX_LAT, MAX_LAT))
+    x = (np.asarray(lon, np.float64) + 180.) / 360.
+    y = (1. - np.log(np.tan(lat) + 1. / np.cos(lat)) / np.pi) / 2.
+    return x, y
+
+class Pyramid(object):
+
+    def __init__(self, levels):
+        # levels[z] is a list of (id, x, y, (xmin, ymin, xmax, ymax)).
+        self.levels = levels
+        self.max_zoom = len(levels) - 1
+        self.nbytes = sum(x.nbytes + y.nbytes for level in levels
+                          for _, x, y, _ in level)
+
+    def level(self, z):
+        return self.levels[min(z, self.max_zoom)]
+
+def _bbox(x, y):
+    return x.min(), y.min(), x.max(), y.max()
+
+# trajectories: iterable of (id, lon, lat)
+def build_pyramid(trajectories, max_zoom=14):
+    level = []
+    for id, lon, lat in trajectories:
+        if len(lon) < 2:
+            continue
+        x, y = mercator(lon, lat)
+        level.append((id, x, y))
+    levels = [None] * (max_zoom + 1)
+    for z in range(max_zoom, -1, -1):
+        tolerance = 0.5 / (TILE_SIZE * 2 ** z)
+        simplified = []
+        for id, x, y in level:
+            keep = douglas_peucker(x, y, tolerance)
+            simplified.append((id, x[keep], y[keep]))
+        levels[z] = [(id, x, y, _bbox(x, y)) for id, x, y in simplified]
+        level = simplified
+    return Pyramid(levels)
+
+# Protobuf encoding
+
+def _varints(values):
+    v = np.asarray(values, np.uint64)
+    if len(v) == 0:
+        return b""
+    shifts = np.arange(0, 64, 7, dtype=np.uint64)
+    groups = (v[:, None] >> shifts) & np.uint64(0x7f)
+    more = np.zeros(groups.shape, bool)
+    more[:, :-1] = (v[:, None] >> shifts[1:]) != 0
+    keep = np.ones(groups.shape, bool)
+    keep[:, 1:] = more[:, :-1]
+    data = (groups | np.where(more, np.uint64(0x80), np.uint64(0))).astype(np.uint8)
+    return data[keep].tobytes()
+
+def _varint(value):
+    return _varints([value])
+
+def _field(number, wire_type):
+    return _varint((number << 3) | wire_type)
+
+def _bytes_field(number, data):
+    return _field(number, 2) + _varint(len(data)) + data
+
+def _zigzag(v):
+    v = np.asarray(v, np.int64)
+    return ((v << 1) ^ (v >> 63)).astype(np.uint64)
+
+MOVE_TO, LINE_TO = 1, 2
+
+def _command(command, count):
+    return (count << 3) | command
+
+# Splits a line into its parts inside box.  Every segment is clipped to the
+# box on its own (Liang-Barsky), so a segment crossing the box with both ends
+# outside of it is kept too; consecutive segments that are not cut where they
+# meet form one part.
+def _clip(x, y, box):
+    x0, y0, x1, y1 = box
+    xa, ya = x[:-1], y[:-1]
+    dx, dy = np.diff(x), np.diff(y)
+    t0, t1 = np.zeros(len(dx)), np.ones(len(dx))
+    keep = np.ones(len(dx), bool)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for p, q in ((-dx, xa - x0), (dx, x1 - xa), (-dy, ya - y0), (dy, y1 - ya)):
+            keep &= (p != 0) | (q >= 0)
+            r = q / p
+            t0 = np.where(p < 0, np.maximum(t0, r), t0)
+            t1 = np.where(p > 0, np.minimum(t1, r), t1)
+    keep &= t0 <= t1
+    segments = np.flatnonzero(keep)
+    if not len(segments):
+        return []
+    # A part ends where the next kept segment doesn't start at this one's end.
+    joined = (np.diff(segments) == 1) & (t1[segments[:-1]] == 1) & (t0[segments[1:]] == 0)
+    bounds = np.flatnonzero(~joined) + 1
+    parts = []
+    for run in np.split(segments, bounds):
+        parts.append((np.concatenate(([xa[run[0]] + t0[run[0]] * dx[run[0]]], xa[run] + t1[run] * dx[run])),
+                      np.concatenate(([ya[run[0]] + t0[run[0]] * dy[run[0]]], ya[run] + t1[run] * dy[run]))))
+    return parts
+
+def _geometry(parts):
+    values, cursor = [], np.zeros(2, np.int64)
+    for px, py in parts:
+        points = np.column_stack((px, py))
+        # Drop vertices that land on the same tile coordinate.
+        if len(points) > 1:
+            points = points[np.concatenate(([True], (np.diff(points, axis=0) != 0).any(axis=1)))]
+        if len(points) < 2:
+            continue
+        deltas = np.diff(np.vstack((cursor, points)), axis=0)
+        cursor = points[-1]
+        zz = _zigzag(deltas)
+        values.append(np.array([_command(MOVE_TO, 1)], np.uint64))
+        values.append(zz[0])
+        values.append(np.array([_command(LINE_TO, len(points) - 1)], np.uint64))
+        values.append(zz[1:].ravel())
+    if not values:
+        return None
+    return _varints(np.concatenate(values))
+
+def encode_tile(pyramid, z, x, y, layer="trajectories", extent=4096, buffer=64):
+    n = 2 ** z
+    pad = float(buffer) / extent / n
+    box = (float(x) / n - pad, float(y) / n - pad,
+           float(x + 1) / n + pad, float(y + 1) / n + pad)
+    features = []
+    for id, lx, ly, (bx0, by0, bx1, by1) in pyramid.level(z):
+        if bx1 < box[0] or bx0 > box[2] or by1 < box[1] or by0 > box[3]:
+            continue
+        parts = [(np.rint((px * n - x) * extent).astype(np.int64),
+                  np.rint((py * n - y) * extent).astype(np.int64))
+                 for px, py in _clip(lx, ly, box)]
+        geometry = _geometry(parts)
+        if geometry is None:
+            continue
+        feature = b""
+        if isinstance(id, (int, long, np.integer)) and id >= 0:
+            feature += _field(1, 0) + _varint(int(id))
+        feature += _field(3, 0) + _varint(2)
+        feature += _bytes_field(4, geometry)
+        features.append(_bytes_field(2, feature))
+    if not features:
+        return b""
+    data = _field(15, 0) + _varint(2)
+    data += _bytes_field(1, layer.encode("utf-8"))
+    data += b"".join(features)
+    data += _field(5, 0) + _varint(extent)
+    return _bytes_field(3, data)